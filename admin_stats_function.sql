@@ -0,0 +1,35 @@
+-- Server-side aggregation for /api/admin/stats/ (STATS_MODE=rpc)
+-- Run this in your Supabase SQL Editor after supabase_schema.sql
+-- Returns one row per (confirmation_agent, status) instead of every order
+
+CREATE OR REPLACE FUNCTION admin_order_stats(p_agent TEXT DEFAULT NULL)
+RETURNS TABLE (
+    confirmation_agent TEXT,
+    status TEXT,
+    order_count BIGINT,
+    total_amount NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COALESCE(o.confirmation_agent, '') AS confirmation_agent,
+        COALESCE(o.status, '') AS status,
+        COUNT(*) AS order_count,
+        -- total_amount may hold text like '3,500'; strip separators before summing
+        -- and count anything that still isn't a number as 0 instead of failing the query
+        COALESCE(SUM(
+            CASE WHEN REPLACE(o.total_amount::TEXT, ',', '') ~ '^-?[0-9]+(\.[0-9]+)?$'
+                 THEN REPLACE(o.total_amount::TEXT, ',', '')::NUMERIC
+            END
+        ), 0) AS total_amount
+    FROM api_order o
+    WHERE p_agent IS NULL OR o.confirmation_agent = p_agent
+    GROUP BY 1, 2;
+$$;
+
+-- Expose the function through PostgREST (POST /rest/v1/rpc/admin_order_stats)
+GRANT EXECUTE ON FUNCTION admin_order_stats(TEXT) TO anon, authenticated;
+
+-- Keeps the per-agent variant an index scan
+CREATE INDEX IF NOT EXISTS idx_api_order_agent_status ON api_order (confirmation_agent, status);
@@ -8,10 +8,11 @@ import os
 import requests
 import numpy as np
 import librosa
-from PIL import Image, ImageDraw
+from PIL import Image
 from django.conf import settings
 from supabase import create_client, Client
 import logging
+from waveform_sprites import get_bar_atlas
 
 logger = logging.getLogger(__name__)
 
@@ -142,7 +143,7 @@ class DjangoSpotifyWaveformGenerator:
         """Create the Spotify-style waveform code image with vertical bars."""
         # Create white background (Spotify style)
         image = Image.new('RGB', (self.width, self.height), 'white')
-        draw = ImageDraw.Draw(image)
+        atlas = get_bar_atlas(self.bar_width, min_height=4, max_height=self.max_bar_height)
         
         # Calculate total width needed for bars
         total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
@@ -155,14 +156,12 @@ class DjangoSpotifyWaveformGenerator:
             
             # Center the bar vertically
             y_start = (self.height - bar_height) // 2
-            y_end = y_start + bar_height
             
             # Calculate x position
             x_start = start_x + i * (self.bar_width + self.bar_spacing)
-            x_end = x_start + self.bar_width
             
-            # Draw rounded rectangle for each bar (Spotify style)
-            self._draw_spotify_bar(draw, x_start, y_start, x_end, y_end, 'black')
+            # Paste the pre-rendered rounded bar (Spotify style)
+            atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
         
         # Convert to bytes
         img_byte_arr = io.BytesIO()
@@ -171,18 +170,6 @@ class DjangoSpotifyWaveformGenerator:
         
         return img_byte_arr.getvalue()
     
-    def _draw_spotify_bar(self, draw, x1, y1, x2, y2, fill):
-        """Draw a rounded rectangle bar in Spotify style."""
-        # Calculate corner radius (smaller of width/2 or height/2)
-        corner_radius = min(self.bar_width // 2, (y2 - y1) // 2)
-        
-        if corner_radius <= 0:
-            # Draw regular rectangle if too small for rounded corners
-            draw.rectangle([x1, y1, x2, y2], fill=fill)
-        else:
-            # Draw rounded rectangle (Spotify style)
-            draw.rounded_rectangle([x1, y1, x2, y2], radius=corner_radius, fill=fill)
-    
     def _upload_to_supabase_storage(self, image_bytes: bytes, filename: str) -> str:
         """Upload Spotify waveform code to Supabase Storage (wave_codes bucket)."""
         try:
@@ -8,11 +8,13 @@ import os
 import requests
 import numpy as np
 import librosa
-from PIL import Image, ImageDraw
+from PIL import Image
 from django.conf import settings
 from supabase import create_client, Client
 import logging
 
+from .waveform_sprites import get_bar_atlas
+
 logger = logging.getLogger(__name__)
 
 class SpotifyWaveformGenerator:
@@ -123,7 +125,7 @@ class SpotifyWaveformGenerator:
         """Create the waveform code image."""
         # Create white background
         image = Image.new('RGB', (self.width, self.height), 'white')
-        draw = ImageDraw.Draw(image)
+        atlas = get_bar_atlas(self.bar_width, min_height=4, max_height=self.max_bar_height)
         
         # Calculate total width needed for bars
         total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
@@ -136,14 +138,12 @@ class SpotifyWaveformGenerator:
             
             # Center the bar vertically
             y_start = (self.height - bar_height) // 2
-            y_end = y_start + bar_height
             
             # Calculate x position
             x_start = start_x + i * (self.bar_width + self.bar_spacing)
-            x_end = x_start + self.bar_width
             
-            # Draw rounded rectangle for each bar
-            self._draw_rounded_bar(draw, x_start, y_start, x_end, y_end, 'black')
+            # Paste the pre-rendered rounded bar
+            atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
         
         # Convert to bytes
         img_byte_arr = io.BytesIO()
@@ -152,18 +152,6 @@ class SpotifyWaveformGenerator:
         
         return img_byte_arr.getvalue()
     
-    def _draw_rounded_bar(self, draw, x1, y1, x2, y2, fill):
-        """Draw a rounded rectangle bar."""
-        # Calculate corner radius (smaller of width/2 or height/2)
-        corner_radius = min(self.bar_width // 2, (y2 - y1) // 2)
-        
-        if corner_radius <= 0:
-            # Draw regular rectangle if too small for rounded corners
-            draw.rectangle([x1, y1, x2, y2], fill=fill)
-        else:
-            # Draw rounded rectangle
-            draw.rounded_rectangle([x1, y1, x2, y2], radius=corner_radius, fill=fill)
-    
     def _upload_to_supabase(self, image_bytes: bytes, output_name: str) -> str:
         """Upload image to Supabase Storage."""
         try:
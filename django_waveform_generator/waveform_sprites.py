@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered bar sprites for the waveform code renderers.
+Vendored copy of the repository's waveform_sprites.py so this app stays
+self-contained; keep the two in sync (test_waveform_sprites.py checks).
+Bar heights come from a small discrete range, so each possible bar is drawn
+once (with the renderer's own corner-radius rule) into a 1-bit mask and then
+pasted onto every image. PIL's rectangle fills are not anti-aliased, so
+pasting a fill colour through the mask gives exactly the pixels the
+rounded_rectangle call would have drawn.
+"""
+
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+
+def spotify_code_radius(bar_width, bar_height):
+    """Corner radius used by supabase_docker_api's waveform codes"""
+    return min(bar_width // 2, max(2, bar_height // 4))
+
+
+def half_height_radius(bar_width, bar_height):
+    """Corner radius used by the generator classes and the older APIs"""
+    return min(bar_width // 2, bar_height // 2)
+
+
+class BarSpriteAtlas:
+    """Masks for bars of one width and corner rule, indexed by height.
+
+    A bar of height h covers the inclusive box [x, y, x + bar_width, y + h],
+    the same box the renderers pass to draw.rounded_rectangle. Heights
+    min_height..max_height are rendered up front; any other height is
+    rendered on first use and kept.
+    """
+
+    def __init__(self, bar_width, radius_rule=half_height_radius, min_height=0, max_height=0):
+        self.bar_width = bar_width
+        self.radius_rule = radius_rule
+        self._sprites = {}
+        self._lock = threading.Lock()
+        for height in range(min_height, max_height + 1):
+            self._sprites[height] = self._render(height)
+
+    def _render(self, height):
+        mask = Image.new('1', (self.bar_width + 1, height + 1), 0)
+        draw = ImageDraw.Draw(mask)
+        box = [0, 0, self.bar_width, height]
+        radius = self.radius_rule(self.bar_width, height)
+        if radius <= 0:
+            draw.rectangle(box, fill=1)
+        else:
+            draw.rounded_rectangle(box, radius=radius, fill=1)
+        return mask
+
+    def sprite(self, height):
+        mask = self._sprites.get(height)
+        if mask is None:
+            with self._lock:
+                mask = self._sprites.get(height)
+                if mask is None:
+                    mask = self._sprites[height] = self._render(height)
+        return mask
+
+    def paste_bar(self, image, x, y, height, fill):
+        """Draw the bar whose box is [x, y, x + bar_width, y + height]"""
+        image.paste(fill, (x, y), self.sprite(height))
+
+
+@lru_cache(maxsize=None)
+def get_bar_atlas(bar_width, radius_rule=half_height_radius, min_height=0, max_height=0):
+    """Shared atlas per (bar width, corner rule, pre-rendered range) for the process"""
+    return BarSpriteAtlas(bar_width, radius_rule, min_height, max_height)
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { 
   Search, Download, Play, Pause, ExternalLink, Plus, UserPlus, Trash2, 
   Edit, ChevronLeft, ChevronRight, X, Save, Users, Copy, 
@@ -11,7 +11,7 @@ import {
   getOrders, updateOrderStatus, getConfirmationAgents, addConfirmationAgent, 
   deleteConfirmationAgent, deleteOrder, updateOrderDetails, getSettings, 
   updateSettings, getAdminStats, Settings, getAdminUsers, addAdminUser, 
-  deleteAdminUser, createOrder 
+  deleteAdminUser, createOrder, getOrdersExportUrl, waitForWaveform 
 } from "@/lib/api";
 import { Order, AdminStatsData } from "@/lib/types";
 import Login from "@/components/Login";
@@ -45,6 +45,8 @@ export default function AdminPage() {
   const [limit] = useState(30);
   const [totalPages, setTotalPages] = useState(1);
   const [totalOrders, setTotalOrders] = useState(0);
+  // next_cursor returned for each page, so deep pages use keyset pagination
+  const pageCursors = useRef<Record<number, string | undefined>>({});
 
   // Edit Modal
   const [editingOrder, setEditingOrder] = useState<Order | null>(null);
@@ -154,9 +156,10 @@ export default function AdminPage() {
       const userAgentName = localStorage.getItem("admin_agent_name") || "";
       const activeAgent = userRole === "agent" ? userAgentName : undefined;
       
-      const data: any = await getOrders(page, limit, searchTerm, statusFilter, activeAgent);
+      const data: any = await getOrders(page, limit, searchTerm, statusFilter, activeAgent, pageCursors.current[page]);
 
       if (data && data.orders) {
+        pageCursors.current[page + 1] = data.next_cursor || undefined;
         setOrders(data.orders);
         setVisibleOrders(data.orders);
         setTotalPages(data.total_pages);
@@ -223,6 +226,10 @@ export default function AdminPage() {
     }
   };
 
+  useEffect(() => {
+    pageCursors.current = {};
+  }, [searchTerm, statusFilter, role]);
+
   useEffect(() => {
     if (isAuthenticated) {
       loadAgents();
@@ -380,7 +387,7 @@ export default function AdminPage() {
         confirmation_agent: newOrderForm.confirmation_agent || undefined
       };
 
-      await createOrder(payload, newOrderAudio || undefined);
+      const created = await createOrder(payload, newOrderAudio || undefined);
       
       alert("تم تسجيل الطلب اليدوي بنجاح!");
       
@@ -401,6 +408,13 @@ export default function AdminPage() {
       
       // Refresh page
       fetchOrders();
+
+      // The waveform code is generated in the background: refresh again once it is ready
+      if (created.scan_id && (created.waveform_status === "pending" || created.waveform_status === "processing")) {
+        waitForWaveform(created.scan_id)
+          .then(() => fetchOrders(true))
+          .catch((err) => console.error("Error polling waveform status:", err));
+      }
       loadStats();
     } catch (err: any) {
       console.error("Error creating manual order:", err);
@@ -420,35 +434,11 @@ export default function AdminPage() {
   };
 
   const exportToCSV = () => {
-    if (orders.length === 0) return;
-
-    const headers = [
-      "ID", "Scan ID", "Name", "Phone", "Wilaya", "Address", "Price", "Status", "Agent", "Date"
-    ];
-
-    const rows = visibleOrders.map((order) => [
-      order.id,
-      order.scan_id,
-      `"${order.customer_name}"`,
-      order.customer_phone,
-      order.wilaya,
-      `"${order.delivery_address}"`,
-      order.total_amount,
-      order.status,
-      order.confirmation_agent || "",
-      order.created_at ? new Date(order.created_at).toLocaleDateString() : "",
-    ]);
-
-    const csvContent = [
-      headers.join(","),
-      ...rows.map((row) => row.join(",")),
-    ].join("\n");
-
-    const blob = new Blob([csvContent], { type: "text/csv;charset=utf-8;" });
-    const url = URL.createObjectURL(blob);
+    // Server-side streaming export of every order matching the current filters
+    const userRole = localStorage.getItem("admin_role") || "admin";
+    const agent = userRole === "agent" ? localStorage.getItem("admin_agent_name") || "" : "";
     const link = document.createElement("a");
-    link.href = url;
-    link.setAttribute("download", `orders_${new Date().toISOString().split("T")[0]}.csv`);
+    link.href = getOrdersExportUrl({ format: "csv", search: searchTerm, status: statusFilter, agent });
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
@@ -27,9 +27,24 @@ const API_URL = getApiUrl();
 export interface CreateOrderResponse {
   success: boolean;
   order_id?: string;
+  scan_id?: string;
   message?: string;
   qr_code_url?: string;
   waveform_url?: string;
+  // Set when the waveform code is generated in the background (HTTP 202)
+  waveform_status?: "pending" | "processing" | "ready" | "failed";
+  status_url?: string;
+}
+
+export interface WaveformStatus {
+  success: boolean;
+  scan_id: string;
+  waveform_status: "pending" | "processing" | "ready" | "failed";
+  qr_code_url: string;
+  waveform_url: string;
+  audio_url: string;
+  attempts: number;
+  error?: string | null;
 }
 
 export const createOrder = async (
@@ -83,6 +98,7 @@ export interface PaginatedOrders {
   page: number;
   limit: number;
   total_pages: number;
+  next_cursor?: string | null;
 }
 
 export const getOrders = async (
@@ -90,11 +106,12 @@ export const getOrders = async (
   limit = 30,
   search?: string,
   status?: string,
-  agent?: string
+  agent?: string,
+  cursor?: string
 ): Promise<PaginatedOrders> => {
   try {
     const response = await axios.get(`${API_URL}/orders`, {
-      params: { page, limit, search, status, agent }
+      params: { page, limit, search, status, agent, cursor }
     });
     // Handle both old array format (fallback) and new paginated format
     if (Array.isArray(response.data)) {
@@ -130,6 +147,63 @@ export const updateOrderStatus = async (
   }
 };
 
+export const getWaveformStatus = async (scanId: string): Promise<WaveformStatus> => {
+  const response = await axios.get(`${API_URL}/waveform-status/${scanId}/`);
+  return response.data;
+};
+
+// Poll the background waveform generation until the code is ready or failed
+// (or the timeout passes); resolves with the last status seen
+export const waitForWaveform = async (
+  scanId: string,
+  { intervalMs = 2000, timeoutMs = 60000 } = {}
+): Promise<WaveformStatus> => {
+  const deadline = Date.now() + timeoutMs;
+  let status = await getWaveformStatus(scanId);
+  while (
+    (status.waveform_status === "pending" || status.waveform_status === "processing") &&
+    Date.now() < deadline
+  ) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    status = await getWaveformStatus(scanId);
+  }
+  return status;
+};
+
+// Streaming export download (CSV or NDJSON); the browser saves the response directly
+export const getOrdersExportUrl = (params: {
+  format?: "csv" | "ndjson";
+  search?: string;
+  status?: string;
+  agent?: string;
+  from?: string;
+  to?: string;
+}) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value) query.set(key, value);
+  });
+  return `${API_URL}/orders/export?${query.toString()}`;
+};
+
+export const bulkUpdateOrderStatus = async (
+  orderIds: (string | number)[],
+  status: string,
+  confirmationAgent?: string
+) => {
+  try {
+    const response = await axios.put(`${API_URL}/orders/bulk-status`, {
+      order_ids: orderIds,
+      status,
+      confirmation_agent: confirmationAgent,
+    });
+    return response.data;
+  } catch (error) {
+    console.error("Error bulk updating order status:", error);
+    throw error;
+  }
+};
+
 export const updateOrderDetails = async (orderId: string | number, updates: any) => {
   try {
     const response = await axios.put(`${API_URL}/orders/${orderId}`, updates);
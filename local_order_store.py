@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed local order store (the fallback copy of api_order).
+Orders are kept as JSON documents with the columns the API filters on pulled
+out and indexed, in WAL mode so several gunicorn workers can share the file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from order_journal import order_key
+from order_pagination import canonical_created_at
+from order_search import ngrams, normalize_query, order_search_key
+
+INDEXED_FIELDS = ("id", "scan_id", "frame_id", "status", "confirmation_agent",
+                  "customer_name", "customer_phone", "created_at")
+
+
+# Orders saved while Supabase was unreachable (partial-indexed)
+UNSYNCED_CLAUSE = "json_extract(data, '$.supabase_error') = 1"
+# Synced orders changed while Supabase was unreachable: the changed columns,
+# replayed as a PATCH by id instead of re-sending the whole row (partial-indexed)
+PENDING_PATCH_CLAUSE = "json_extract(data, '$.pending_patch') IS NOT NULL"
+# Replay bookkeeping for orders Supabase rejected (see defer_replay)
+OUTBOX_FIELDS = ("outbox_error", "outbox_attempts", "outbox_retry_at")
+RETRY_DUE_CLAUSE = "COALESCE(json_extract(data, '$.outbox_retry_at'), 0) <= ?"
+NEWEST_FIRST = "created_at DESC, CAST(id AS INTEGER) DESC"
+
+
+def _column_value(order, field):
+    value = order.get(field)
+    if field == "created_at" and value:
+        # Same form as the keyset cursors, so Supabase and local timestamps compare as strings
+        return canonical_created_at(value)
+    return None if value is None else str(value)
+
+
+class LocalOrderStore:
+    """Order documents in SQLite with indexes on id, scan_id, frame_id, status
+    and confirmation_agent (each paired with created_at for newest-first reads).
+
+    Every read-modify-write runs inside BEGIN IMMEDIATE, so concurrent workers
+    never lose each other's updates. Connections are kept per thread.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _init_db(self):
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS local_orders (
+                key TEXT PRIMARY KEY,
+                id TEXT,
+                scan_id TEXT,
+                frame_id TEXT,
+                status TEXT,
+                confirmation_agent TEXT,
+                customer_name TEXT,
+                customer_phone TEXT,
+                created_at TEXT,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS local_store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Trigram index over the normalized name/phone/scan_id search key
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS local_order_ngrams (
+                gram TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (gram, key)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_order_ngrams_key ON local_order_ngrams (key)")
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(local_orders)")}
+        if "search_key" not in columns:
+            conn.execute("ALTER TABLE local_orders ADD COLUMN search_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_id ON local_orders (id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_scan_id ON local_orders (scan_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_frame ON local_orders (frame_id, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_status ON local_orders (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_agent ON local_orders (confirmation_agent, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_created ON local_orders (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_unsynced ON local_orders (created_at) "
+                     f"WHERE {UNSYNCED_CLAUSE}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_local_orders_pending_patch ON local_orders (created_at) "
+                     f"WHERE {PENDING_PATCH_CLAUSE}")
+        self._backfill_search_keys()
+        self._backfill_created_at()
+
+    def _backfill_search_keys(self):
+        """Index orders stored before the search key existed"""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT data FROM local_orders WHERE search_key IS NULL").fetchall()
+            for row in rows:
+                self._write(conn, json.loads(row["data"]))
+
+    def _backfill_created_at(self):
+        """Rewrite created_at columns stored before they were kept in canonical form"""
+        marker = "canonical_created_at"
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM local_store_meta WHERE key = ?", (marker,)).fetchone():
+                return
+            rows = conn.execute("SELECT key, created_at FROM local_orders WHERE created_at IS NOT NULL").fetchall()
+            for row in rows:
+                canonical = canonical_created_at(row["created_at"])
+                if canonical != row["created_at"]:
+                    conn.execute("UPDATE local_orders SET created_at = ? WHERE key = ?", (canonical, row["key"]))
+            conn.execute("INSERT INTO local_store_meta (key, value) VALUES (?, ?)", (marker, str(len(rows))))
+
+    @staticmethod
+    def _write(conn, order):
+        key = order_key(order)
+        search_key = order_search_key(order)
+        conn.execute(
+            f"INSERT OR REPLACE INTO local_orders (key, {', '.join(INDEXED_FIELDS)}, search_key, data) "
+            f"VALUES ({', '.join('?' * (len(INDEXED_FIELDS) + 3))})",
+            (key,) + tuple(_column_value(order, f) for f in INDEXED_FIELDS) + (search_key, json.dumps(order))
+        )
+        conn.execute("DELETE FROM local_order_ngrams WHERE key = ?", (key,))
+        conn.executemany("INSERT INTO local_order_ngrams (gram, key) VALUES (?, ?)",
+                         [(gram, key) for gram in ngrams(search_key)])
+
+    def upsert(self, order):
+        with self._transaction() as conn:
+            self._write(conn, order)
+
+    def import_orders(self, orders, marker=None):
+        """Bulk-load orders once; with a marker, later calls (from any worker) are no-ops.
+        Returns the number of orders imported."""
+        with self._transaction() as conn:
+            if marker and conn.execute("SELECT 1 FROM local_store_meta WHERE key = ?", (marker,)).fetchone():
+                return 0
+            for order in orders:
+                self._write(conn, order)
+            if marker:
+                conn.execute("INSERT INTO local_store_meta (key, value) VALUES (?, ?)", (marker, str(len(orders))))
+        return len(orders)
+
+    def _fetch(self, where, params, limit=None):
+        sql = f"SELECT data FROM local_orders WHERE {where} ORDER BY {NEWEST_FIRST}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(row["data"]) for row in self._conn().execute(sql, params)]
+
+    def get(self, order_id):
+        rows = self._fetch("id = ?", (str(order_id),), limit=1)
+        return rows[0] if rows else None
+
+    def get_by_scan_id(self, scan_id):
+        rows = self._fetch("scan_id = ?", (str(scan_id),), limit=1)
+        return rows[0] if rows else None
+
+    def find(self, identifier):
+        """Look an order up by scan_id, then by id"""
+        return self.get_by_scan_id(identifier) or self.get(identifier)
+
+    def _update(self, column, value, updates, queue_patch=False):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT key, data FROM local_orders WHERE {column} = ? LIMIT 1",
+                               (str(value),)).fetchone()
+            if not row:
+                return None
+            order = json.loads(row["data"])
+            order.update(updates)
+            if queue_patch and not order.get('supabase_error'):
+                order['pending_patch'] = dict(order.get('pending_patch') or {}, **updates)
+            if order_key(order) != row["key"]:
+                conn.execute("DELETE FROM local_orders WHERE key = ?", (row["key"],))
+                conn.execute("DELETE FROM local_order_ngrams WHERE key = ?", (row["key"],))
+            self._write(conn, order)
+        return order
+
+    def update(self, order_id, updates, queue_patch=False):
+        """Merge updates into the order with this id; returns the new order or None
+        (queue_patch: see update_many)"""
+        return self._update("id", order_id, updates, queue_patch)
+
+    def update_by_scan_id(self, scan_id, updates):
+        return self._update("scan_id", scan_id, updates)
+
+    def update_many(self, order_ids, updates, queue_patch=False):
+        """Merge the same updates into every order with one of these ids, in one
+        transaction; returns the updated orders (ids not stored are skipped).
+        With queue_patch, synced orders also collect the updates in pending_patch
+        for the outbox (unsynced ones are re-sent whole anyway)"""
+        ids = [str(order_id) for order_id in order_ids]
+        updated = []
+        with self._transaction() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(f"SELECT key, data FROM local_orders WHERE id IN ({', '.join('?' * len(chunk))})",
+                                    chunk).fetchall()
+                for row in rows:
+                    order = json.loads(row["data"])
+                    order.update(updates)
+                    if queue_patch and not order.get('supabase_error'):
+                        order['pending_patch'] = dict(order.get('pending_patch') or {}, **updates)
+                    self._write(conn, order)
+                    updated.append(order)
+        return updated
+
+    def delete(self, order_id):
+        """Delete the order with this id; returns True if one was removed"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM local_order_ngrams WHERE key IN (SELECT key FROM local_orders WHERE id = ?)",
+                         (str(order_id),))
+            return conn.execute("DELETE FROM local_orders WHERE id = ?", (str(order_id),)).rowcount > 0
+
+    def unsynced(self, limit=None, now=None):
+        """Orders saved while Supabase was unreachable, oldest first (the outbox).
+        Only orders with a scan_id, the key replays are made idempotent on;
+        orders deferred by defer_replay are skipped until their retry time."""
+        sql = (f"SELECT data FROM local_orders WHERE {UNSYNCED_CLAUSE} AND COALESCE(scan_id, '') != '' "
+               f"AND {RETRY_DUE_CLAUSE} ORDER BY created_at")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(row["data"]) for row in self._conn().execute(sql, (time.time() if now is None else now,))]
+
+    def pending_patches(self, limit=None, now=None):
+        """Synced orders with a pending_patch to replay, oldest first (deferred ones skipped)"""
+        sql = f"SELECT data FROM local_orders WHERE {PENDING_PATCH_CLAUSE} AND {RETRY_DUE_CLAUSE} ORDER BY created_at"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(row["data"]) for row in self._conn().execute(sql, (time.time() if now is None else now,))]
+
+    def clear_pending_patch(self, pushed):
+        """Drop a replayed pending_patch, unless the order collected more changes
+        since it was read (then the next round sends the merged patch)"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM local_orders WHERE key = ?", (order_key(pushed),)).fetchone()
+            if not row:
+                return None
+            order = json.loads(row["data"])
+            if order.get('pending_patch') == pushed.get('pending_patch'):
+                order.pop('pending_patch', None)
+                for field in OUTBOX_FIELDS:
+                    order.pop(field, None)
+                self._write(conn, order)
+        return order
+
+    def defer_replay(self, pushed, error, attempts, retry_at):
+        """Record that Supabase rejected this order's replay: it stays queued but
+        unsynced() / pending_patches() skip it until retry_at. Returns the stored
+        order, or None if it was deleted meanwhile."""
+        key = order_key(pushed)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM local_orders WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            order = json.loads(row["data"])
+            order.update(outbox_error=str(error), outbox_attempts=attempts, outbox_retry_at=retry_at)
+            self._write(conn, order)
+        return order
+
+    def mark_synced(self, pushed, cloud_id):
+        """Re-key a replayed order to its Supabase id and clear supabase_error.
+
+        pushed is the order as it was sent; if the local copy changed since,
+        it is re-keyed but stays unsynced so the next replay sends the change.
+        Returns the stored order, or None if it was deleted meanwhile.
+        """
+        old_key = order_key(pushed)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM local_orders WHERE key = ?", (old_key,)).fetchone()
+            if not row:
+                return None
+            order = json.loads(row["data"])
+            unchanged = order == pushed
+            order['id'] = cloud_id
+            if unchanged:
+                order.pop('supabase_error', None)
+                for field in OUTBOX_FIELDS:
+                    order.pop(field, None)
+            if order_key(order) != old_key:
+                conn.execute("DELETE FROM local_orders WHERE key = ?", (old_key,))
+                conn.execute("DELETE FROM local_order_ngrams WHERE key = ?", (old_key,))
+            self._write(conn, order)
+        return order
+
+    def _filters(self, status=None, agent=None, search=None, after=None, unsynced_only=False,
+                 created_from=None, created_to=None):
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if agent:
+            clauses.append("confirmation_agent = ?")
+            params.append(agent)
+        if search:
+            query = normalize_query(search)
+            grams = sorted(ngrams(query))
+            if grams:
+                # Candidates holding every trigram of the query, then an exact substring check
+                clauses.append(
+                    "key IN (SELECT key FROM local_order_ngrams WHERE gram IN "
+                    f"({', '.join('?' * len(grams))}) GROUP BY key HAVING COUNT(*) = ?)"
+                )
+                params.extend(grams + [len(grams)])
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("search_key LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if after:
+            # Keyset: strictly older than the (created_at, id) cursor
+            created_at, order_id = after
+            created_at = canonical_created_at(created_at)
+            clauses.append("(created_at < ? OR (created_at = ? AND CAST(id AS INTEGER) < ?))")
+            params.extend([created_at, created_at, order_id])
+        if unsynced_only:
+            clauses.append(UNSYNCED_CLAUSE)
+        if created_from:
+            clauses.append("created_at >= ?")
+            params.append(canonical_created_at(created_from))
+        if created_to:
+            clauses.append("created_at < ?")
+            params.append(canonical_created_at(created_to))
+        return " AND ".join(clauses) or "1", params
+
+    def query(self, status=None, agent=None, search=None, limit=None, after=None, unsynced_only=False,
+              created_from=None, created_to=None):
+        """Orders matching the filters, newest first by (created_at, id); with after,
+        only orders strictly older than that (created_at, id) key. created_from /
+        created_to bound created_at (inclusive / exclusive)"""
+        where, params = self._filters(status, agent, search, after, unsynced_only, created_from, created_to)
+        return self._fetch(where, params, limit=limit)
+
+    def iter_query(self, chunk_size=500, **filters):
+        """query() as a generator reading chunk_size rows at a time (keyset paged)"""
+        after = None
+        while True:
+            rows = self.query(limit=chunk_size, after=after, **filters)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]
+            try:
+                last_id = int(last.get('id'))
+            except (TypeError, ValueError):
+                last_id = 0
+            after = (last.get('created_at'), last_id)
+
+    def count(self, status=None, agent=None, search=None, unsynced_only=False, created_from=None, created_to=None):
+        where, params = self._filters(status, agent, search, unsynced_only=unsynced_only,
+                                      created_from=created_from, created_to=created_to)
+        return self._conn().execute(f"SELECT COUNT(*) FROM local_orders WHERE {where}", params).fetchone()[0]
+
+    def all(self):
+        return self.query()
+
+    def grouped_stats(self, agent=None):
+        """(confirmation_agent, status, count, total_amount sum) per group, like the
+        admin_order_stats() database function"""
+        where, params = self._filters(agent=agent)
+        rows = self._conn().execute(f"""
+            SELECT COALESCE(confirmation_agent, ''), COALESCE(status, ''), COUNT(*),
+                   COALESCE(SUM(CAST(REPLACE(COALESCE(json_extract(data, '$.total_amount'), 0), ',', '') AS REAL)), 0)
+            FROM local_orders WHERE {where}
+            GROUP BY 1, 2
+        """, params)
+        return [tuple(row) for row in rows]
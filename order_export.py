@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Streaming order exports (CSV / NDJSON) for shipping partners.
+The writers consume an iterator of orders and yield text in small batches,
+so a full-history export never holds more than one batch in memory.
+"""
+
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+EXPORT_FIELDS = (
+    "id", "scan_id", "created_at", "status", "confirmation_agent",
+    "customer_name", "customer_phone", "customer_email",
+    "wilaya", "baladya", "city", "delivery_address", "postal_code",
+    "frame_id", "frame_title", "total_amount", "payment_method", "notes",
+    "audio_file_url", "qr_code_url"
+)
+
+BATCH_SIZE = 200
+
+# Cells starting with these are run as formulas by Excel / LibreOffice / Sheets
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def spreadsheet_safe(value):
+    """A CSV cell value that a spreadsheet shows as text: customer-entered strings
+    starting with a formula character get a leading quote (CSV injection)"""
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(orders, fields=EXPORT_FIELDS, batch_size=BATCH_SIZE):
+    """CSV text chunks: a BOM + header row first (so Excel reads Arabic names), then rows
+    with formula-like cells neutralized (see spreadsheet_safe)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield "\ufeff" + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    pending = 0
+    for order in orders:
+        writer.writerow([spreadsheet_safe(order.get(f)) for f in fields])
+        pending += 1
+        if pending == batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(orders, fields=EXPORT_FIELDS, batch_size=BATCH_SIZE):
+    """One JSON object per line with the export fields"""
+    lines = []
+    for order in orders:
+        lines.append(json.dumps({f: order.get(f) for f in fields}, ensure_ascii=False))
+        if len(lines) == batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+WRITERS = {"csv": iter_csv, "ndjson": iter_ndjson}
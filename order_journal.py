@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Reader for the legacy local order backup (orders_persistence.json plus its
+append-only journal). The API now keeps local orders in local_order_store.py
+and only reads this format once, to import an existing backup.
+"""
+
+import json
+import os
+
+
+def order_key(order):
+    """Identity of an order in the journal: its id, or its scan_id before it has one"""
+    order_id = order.get('id')
+    return str(order_id) if order_id is not None else f"scan:{order.get('scan_id')}"
+
+
+class OrderJournal:
+    """Snapshot + journal of order mutations, read-only.
+
+    Journal lines are {"op": "upsert", "order": {...}} or
+    {"op": "delete", "id": "..."}, replayed over the snapshot in order.
+    Unreadable lines (e.g. torn by a crash mid-append) are skipped.
+    """
+
+    def __init__(self, snapshot_path, journal_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+
+    def load(self):
+        """Return the orders from the snapshot with the journal replayed on top"""
+        by_key = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                for order in json.load(f) or []:
+                    by_key[order_key(order)] = order
+
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        print(f"⚠️ Skipping unreadable journal line {line_number} in {self.journal_path}")
+                        continue
+                    if entry.get("op") == "upsert":
+                        order = entry["order"]
+                        by_key[order_key(order)] = order
+                    elif entry.get("op") == "delete":
+                        by_key.pop(str(entry.get("id")), None)
+                    replayed += 1
+        if replayed:
+            print(f"📜 Replayed {replayed} journal entries from {self.journal_path}")
+        return list(by_key.values())
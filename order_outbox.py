@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Outbox replay of orders saved locally while Supabase was unreachable.
+Orders stored with supabase_error are pushed to api_order in batches by a
+background worker (an idempotent bulk upsert on scan_id), then re-keyed to
+their Supabase id and marked synced, so they leave the unsynced set every
+order listing merges. Orders that were already synced and only changed
+while Supabase was down carry a pending_patch instead, replayed as a PATCH
+by id so newer cloud columns are not overwritten by the local copy.
+A batch Supabase rejects (e.g. one row breaking a constraint) is retried
+row by row; rows that still fail are deferred with a growing backoff so
+they cannot hold up the rest of the outbox.
+"""
+
+import json
+import threading
+import time
+import traceback
+
+
+class OrderOutbox:
+    """Background replay of store.unsynced() orders.
+
+    push_batch(orders) must upsert the orders and return the resulting rows
+    (each with id and scan_id), raising on failure; upserting on scan_id makes
+    a replay after a lost response harmless. on_synced(pushed, stored) is
+    called for each synced order (as sent, and re-keyed to its Supabase id)
+    to update in-process caches.
+    patch_batch(order_ids, changes) must PATCH those api_order rows with the
+    changes, raising on failure (store.pending_patches() replay).
+    ready() gates each round (e.g. the Supabase circuit breaker).
+    is_rejected(error) tells a push Supabase refused (bad row data) from an
+    outage; only refused pushes are retried per row and deferred, for
+    retry_base * 2 ** (attempts - 1) seconds up to retry_max.
+    """
+
+    def __init__(self, store, push_batch, on_synced=None, ready=None, interval=60, batch_size=50,
+                 is_rejected=None, retry_base=60, retry_max=6 * 3600, patch_batch=None):
+        self.store = store
+        self._push_batch = push_batch
+        self._patch_batch = patch_batch
+        self._on_synced = on_synced
+        self._ready = ready
+        self._is_rejected = is_rejected
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.last_synced = None
+        self.synced_total = 0
+        self.deferred_total = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync_once(self):
+        """Replay unsynced orders, then pending patches, batch by batch until none
+        are left or a push fails; returns the number of orders synced"""
+        if self._ready and not self._ready():
+            return 0
+        # One replay at a time per process; other workers may replay the same
+        # orders concurrently, which the scan_id upsert (and idempotent PATCH) absorbs
+        with self._lock:
+            synced = self._replay_unsynced()
+            patched = self._replay_patches() if self._patch_batch else 0
+        if synced or patched:
+            self.synced_total += synced + patched
+            self.last_synced = time.time()
+            print(f"📤 Outbox replayed {synced} local orders and {patched} status changes to Supabase")
+        return synced + patched
+
+    def _replay_unsynced(self):
+        synced = 0
+        while not self._stop.is_set():
+            batch = self.store.unsynced(limit=self.batch_size)
+            if not batch:
+                break
+            rows, deferred = self._push(batch)
+            cloud_ids = {str(row.get('scan_id')): row.get('id') for row in rows or []}
+            marked = 0
+            for order in batch:
+                cloud_id = cloud_ids.get(str(order.get('scan_id')))
+                if cloud_id is None:
+                    continue
+                stored = self.store.mark_synced(order, cloud_id)
+                if stored is None:
+                    continue
+                marked += 1
+                if not stored.get('supabase_error'):
+                    synced += 1
+                if self._on_synced:
+                    self._on_synced(order, stored)
+            if not marked and not deferred:
+                # Nothing in this batch came back; retry next round
+                break
+        return synced
+
+    def _replay_patches(self):
+        """PATCH pending_patch changes by id, orders sharing a patch together"""
+        patched = 0
+        while not self._stop.is_set():
+            batch = self.store.pending_patches(limit=self.batch_size)
+            if not batch:
+                break
+            groups = {}
+            for order in batch:
+                groups.setdefault(json.dumps(order['pending_patch'], sort_keys=True), []).append(order)
+            progressed = 0
+            for orders in groups.values():
+                done, deferred = self._patch(orders, orders[0]['pending_patch'])
+                for order in done:
+                    # Ids Supabase no longer has are done too: there is nothing left to patch
+                    self.store.clear_pending_patch(order)
+                patched += len(done)
+                progressed += len(done) + deferred
+            if not progressed:
+                break
+        return patched
+
+    def _patch(self, orders, changes):
+        """(orders patched, deferred count), like _push for pending patches"""
+        try:
+            self._patch_batch([str(order['id']) for order in orders], changes)
+            return orders, 0
+        except Exception as e:
+            if not (self._is_rejected and self._is_rejected(e)):
+                raise
+            print(f"⚠️ Outbox patch of {len(orders)} orders rejected, retrying one by one: {e}")
+        done, deferred = [], 0
+        for order in orders:
+            try:
+                self._patch_batch([str(order['id'])], changes)
+                done.append(order)
+            except Exception as e:
+                if not self._is_rejected(e):
+                    raise
+                self._defer(order, e)
+                deferred += 1
+        return done, deferred
+
+    def _push(self, batch):
+        """(rows, deferred count): the batch in one push, or row by row if Supabase
+        rejected it, deferring the rows it still rejects; outages propagate"""
+        try:
+            return self._push_batch(batch), 0
+        except Exception as e:
+            if not (self._is_rejected and self._is_rejected(e)):
+                raise
+            print(f"⚠️ Outbox batch of {len(batch)} rejected, retrying row by row: {e}")
+        rows, deferred = [], 0
+        for order in batch:
+            try:
+                rows.extend(self._push_batch([order]) or [])
+            except Exception as e:
+                if not self._is_rejected(e):
+                    raise
+                self._defer(order, e)
+                deferred += 1
+        return rows, deferred
+
+    def _defer(self, order, error):
+        attempts = int(order.get('outbox_attempts') or 0) + 1
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        self.store.defer_replay(order, error, attempts, time.time() + delay)
+        self.deferred_total += 1
+        print(f"⚠️ Outbox deferred order {order.get('scan_id')} for {delay}s (attempt {attempts}): {error}")
+
+    def wakeup(self):
+        """Run a round now instead of waiting for the interval"""
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="order-outbox", daemon=True)
+        self._thread.start()
+        print(f"✅ Order outbox started (every {self.interval}s, batches of {self.batch_size})")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                traceback.print_exc()
+                print(f"⚠️ Outbox replay failed, will retry: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
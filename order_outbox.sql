@@ -0,0 +1,14 @@
+-- Idempotent replay of locally saved orders (order_outbox.py)
+-- Run this in your Supabase SQL Editor after supabase_schema.sql
+-- The outbox upserts on scan_id (on_conflict=scan_id), which needs a unique
+-- constraint; empty scan_ids become NULL first since NULLs never conflict.
+
+UPDATE api_order SET scan_id = NULL WHERE scan_id = '';
+
+-- If this fails, list the scan_ids saved twice and resolve them first:
+--   SELECT scan_id, array_agg(id) FROM api_order GROUP BY scan_id HAVING COUNT(*) > 1;
+ALTER TABLE api_order
+DROP CONSTRAINT IF EXISTS api_order_scan_id_key;
+
+ALTER TABLE api_order
+ADD CONSTRAINT api_order_scan_id_key UNIQUE (scan_id);
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Keyset (cursor) pagination helpers for /api/orders/.
+Orders are ordered newest first by (created_at, id); a page ends with an
+opaque cursor naming its last order, and the next page starts strictly after
+it in every source (Supabase and the local store), which are then merged.
+"""
+
+import base64
+import heapq
+import json
+from datetime import datetime, timezone
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def canonical_created_at(value):
+    """created_at as a naive-UTC, microsecond ISO string so Supabase
+    ("...12345+00:00") and local ("...123450") timestamps compare correctly"""
+    if not value:
+        return ""
+    text = str(value).replace('Z', '+00:00')
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return text
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+def _int_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def sort_key(order):
+    """(created_at, id) key; pages are in descending order of this key"""
+    return canonical_created_at(order.get('created_at')), _int_id(order.get('id'))
+
+
+def encode_cursor(order):
+    created_at, order_id = sort_key(order)
+    payload = json.dumps({"c": created_at, "i": order_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Return the (created_at, id) key a cursor points at"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(payload["c"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token}") from e
+
+
+def merge_pages(sources, limit):
+    """k-way merge of source lists already sorted newest first, dropping repeated ids.
+    Returns (page, next_cursor); next_cursor is None on the last page.
+
+    Each source should hold up to limit + 1 orders after the cursor so a
+    following page can be detected.
+    """
+    merged = heapq.merge(*sources, key=sort_key, reverse=True)
+    page = []
+    seen = set()
+    has_more = False
+    for order in merged:
+        order_id = str(order.get('id'))
+        if order_id in seen:
+            continue
+        if len(page) == limit:
+            has_more = True
+            break
+        seen.add(order_id)
+        page.append(order)
+    return page, encode_cursor(page[-1]) if has_more and page else None
+
+
+def merge_streams(sources):
+    """Lazy k-way merge of iterables sorted newest first, for exports.
+    Memory stays flat: only an order repeated back to back (same id and key,
+    e.g. a local copy of a row just replayed to Supabase) is dropped."""
+    previous = None
+    for order in heapq.merge(*sources, key=sort_key, reverse=True):
+        identity = (sort_key(order), str(order.get('id')))
+        if identity == previous:
+            continue
+        previous = identity
+        yield order
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Search normalization shared by the Supabase search column (order_search_trgm.sql)
+and the local store's trigram index.
+Names are folded so Arabic letter variants, diacritics and Latin accents match;
+phone numbers are reduced to national-format digits so +213 / 00213 / 0 match.
+The SQL functions in order_search_trgm.sql apply the same mappings.
+"""
+
+import re
+
+# Alef / ya / ta marbuta variants and common Latin accents -> base letter
+FOLD_FROM = "أإآٱىةéèêëàâäîïôöùûüç"
+FOLD_TO = "اااايهeeeeaaaiioouuuc"
+# Arabic diacritics (tashkeel), superscript alef and tatweel are dropped
+DROP_CHARS = "".join(chr(c) for c in range(0x064B, 0x0653)) + "ٰـ"
+ARABIC_DIGITS = "٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹"
+ASCII_DIGITS = "01234567890123456789"
+
+_FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO, DROP_CHARS)
+_DIGIT_TABLE = str.maketrans(ARABIC_DIGITS, ASCII_DIGITS)
+_PHONE_QUERY = re.compile(r"^[\d\s+\-().٠-٩۰-۹]+$")
+# 213 followed by a 9-digit national number
+INTERNATIONAL_PHONE_DIGITS = 12
+
+NGRAM_SIZE = 3
+
+
+def normalize_text(value):
+    """Lowercase, fold letter variants, drop diacritics, collapse whitespace"""
+    text = str(value or "").lower().translate(_FOLD_TABLE)
+    return " ".join(text.split())
+
+
+def normalize_phone(value):
+    """Digits only, Arabic-Indic digits converted, +213/00213 prefix -> 0"""
+    digits = re.sub(r"\D", "", str(value or "").translate(_DIGIT_TABLE))
+    return re.sub(r"^(00)?213", "0", digits)
+
+
+def normalize_query(query):
+    """Normalize a search box value the same way the indexed text was built.
+
+    A leading 213 is only read as the country code when the query says so
+    (+213 / 00213) or is a whole international number; a bare digit fragment
+    like "2134" may be part of a scan_id and is searched as typed.
+    """
+    if _PHONE_QUERY.match(query or ""):
+        digits = re.sub(r"\D", "", query.translate(_DIGIT_TABLE))
+        if not digits:
+            return normalize_text(query)
+        explicit_prefix = query.lstrip().startswith("+") or digits.startswith("00213")
+        if explicit_prefix or len(digits) == INTERNATIONAL_PHONE_DIGITS:
+            return normalize_phone(digits)
+        return digits
+    return normalize_text(query)
+
+
+def order_search_key(order):
+    """The text searched for an order: name, phone and scan_id, normalized"""
+    return " ".join([
+        normalize_text(order.get('customer_name')),
+        normalize_phone(order.get('customer_phone')),
+        str(order.get('scan_id') or "").lower()
+    ])
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    """Distinct character n-grams of text (empty when text is shorter than size)"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
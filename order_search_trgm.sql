@@ -0,0 +1,49 @@
+-- Trigram search for orders (name / phone / scan_id)
+-- Run this in your Supabase SQL Editor after supabase_schema.sql
+-- Adds a normalized search_key column on api_order with a pg_trgm GIN index,
+-- so /api/orders/?search= is an index scan instead of three sequential ILIKEs.
+-- The normalization mirrors order_search.py.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Lowercase, fold Arabic letter variants (أإآٱ -> ا, ى -> ي, ة -> ه) and Latin
+-- accents, drop tashkeel / tatweel, collapse whitespace
+CREATE OR REPLACE FUNCTION normalize_search_text(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT btrim(regexp_replace(
+        translate(
+            lower(COALESCE(value, '')),
+            'أإآٱىةéèêëàâäîïôöùûüç' || 'ًٌٍَُِّْٰـ',
+            'اااايهeeeeaaaiioouuuc'
+        ),
+        '\s+', ' ', 'g'
+    ));
+$$;
+
+-- Digits only (Arabic-Indic digits converted), +213 / 00213 prefix -> 0
+CREATE OR REPLACE FUNCTION normalize_search_phone(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT regexp_replace(
+        regexp_replace(
+            translate(COALESCE(value, ''), '٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789'),
+            '\D', '', 'g'
+        ),
+        '^(00)?213', '0'
+    );
+$$;
+
+ALTER TABLE api_order
+ADD COLUMN IF NOT EXISTS search_key TEXT GENERATED ALWAYS AS (
+    normalize_search_text(customer_name) || ' ' ||
+    normalize_search_phone(customer_phone) || ' ' ||
+    lower(COALESCE(scan_id, ''))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_api_order_search_key_trgm
+    ON api_order USING GIN (search_key gin_trgm_ops);
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained order aggregates for the admin dashboard.
+Counts and shipped revenue per (confirmation_agent, status) are adjusted in
+O(1) on every order create / update / delete and periodically reconciled
+against the full order table, so reading stats never touches order history.
+"""
+
+import threading
+import time
+import traceback
+
+STATS_FIELDS = ("status", "confirmation_agent", "total_amount")
+
+
+def parse_amount(amount):
+    """total_amount as a float ("3,500" and None included)"""
+    try:
+        return float(str(amount or 0).replace(',', ''))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def summarize_cells(cells):
+    """Dashboard stats from grouped (confirmation_agent, status, count, amount_sum) rows"""
+    agent_stats = {}
+    for agent, status, count, _ in cells:
+        if status == 'confirmed' and (agent or "").strip():
+            agent_key = agent.strip()
+            agent_stats[agent_key] = agent_stats.get(agent_key, 0) + count
+    return {
+        "total_orders": sum(c[2] for c in cells),
+        "confirmed_orders": sum(c[2] for c in cells if c[1] == 'confirmed'),
+        "shipped_orders": sum(c[2] for c in cells if c[1] == 'shipped'),
+        "total_revenue": sum(c[3] for c in cells if c[1] == 'shipped'),
+        "agent_stats": agent_stats
+    }
+
+
+def _contribution(order):
+    return (order.get('confirmation_agent') or "", order.get('status') or "", parse_amount(order.get('total_amount')))
+
+
+class OrderStatsAggregator:
+    """Per-(agent, status) order counts and amount sums.
+
+    Each known order's current contribution is remembered by id so a status
+    or agent change moves it between cells in O(1). Changes to orders the
+    aggregator has not seen (created by another process since the last
+    reconcile) mark it dirty, which triggers an early reconcile (at most once
+    per min_interval seconds). Changes made while a reconcile is loading rows
+    are replayed on top of its result; every change is idempotent.
+
+    load_rows() must return every order as a dict with id, status,
+    confirmation_agent and total_amount; it is called by reconcile().
+    """
+
+    def __init__(self, load_rows, reconcile_interval=900, min_interval=60):
+        self._load_rows = load_rows
+        self.reconcile_interval = reconcile_interval
+        self.min_interval = min_interval
+        self.ready = False
+        self.dirty = False
+        self.last_reconciled = None
+        self._cells = {}
+        self._orders = {}
+        self._replay = None
+        self._lock = threading.Lock()
+        # One reconcile at a time: each one owns _replay from reset to replay
+        self._reconcile_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _add(self, key, contribution, sign):
+        agent, status, amount = contribution
+        cell = self._cells.setdefault((agent, status), [0, 0.0])
+        cell[0] += sign
+        cell[1] += sign * amount
+        if cell[0] == 0:
+            del self._cells[(agent, status)]
+        if sign > 0:
+            self._orders[key] = contribution
+        else:
+            self._orders.pop(key, None)
+
+    def _apply(self, operation, *args):
+        with self._lock:
+            operation(*args)
+            if self._replay is not None:
+                self._replay.append((operation, args))
+
+    def record(self, order):
+        """Count a newly created order (or replace a known order's full state)"""
+        self._apply(self._record, str(order.get('id')), _contribution(order))
+
+    def _record(self, key, contribution):
+        previous = self._orders.get(key)
+        if previous is not None:
+            self._add(key, previous, -1)
+        self._add(key, contribution, 1)
+
+    def update(self, order_id, updates):
+        """Apply a partial update (status / confirmation_agent / total_amount)"""
+        changes = {field: updates[field] for field in STATS_FIELDS if field in updates}
+        if changes:
+            self._apply(self._update, str(order_id), changes)
+
+    def update_many(self, order_ids, updates):
+        """Apply the same partial update to many orders under one lock"""
+        changes = {field: updates[field] for field in STATS_FIELDS if field in updates}
+        if changes:
+            self._apply(self._update_many, [str(order_id) for order_id in order_ids], changes)
+
+    def _update_many(self, keys, changes):
+        for key in keys:
+            self._update(key, changes)
+
+    def _update(self, key, changes):
+        previous = self._orders.get(key)
+        if previous is None:
+            self._mark_dirty()
+            return
+        agent, status, amount = previous
+        new = (
+            changes['confirmation_agent'] or "" if 'confirmation_agent' in changes else agent,
+            changes['status'] or "" if 'status' in changes else status,
+            parse_amount(changes['total_amount']) if 'total_amount' in changes else amount
+        )
+        self._add(key, previous, -1)
+        self._add(key, new, 1)
+
+    def remove(self, order_id):
+        self._apply(self._remove, str(order_id))
+
+    def _remove(self, key):
+        previous = self._orders.get(key)
+        if previous is None:
+            self._mark_dirty()
+            return
+        self._add(key, previous, -1)
+
+    def _mark_dirty(self):
+        self.dirty = True
+        self._wakeup.set()
+
+    def reconcile(self):
+        """Rebuild every aggregate from load_rows(); concurrent calls run one after another"""
+        with self._reconcile_lock:
+            self._reconcile()
+
+    def _reconcile(self):
+        started = time.time()
+        with self._lock:
+            self._replay = []
+        try:
+            rows = self._load_rows()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        cells = {}
+        known = {}
+        for row in rows:
+            contribution = _contribution(row)
+            cell = cells.setdefault(contribution[:2], [0, 0.0])
+            cell[0] += 1
+            cell[1] += contribution[2]
+            known[str(row.get('id'))] = contribution
+        with self._lock:
+            self._cells = cells
+            self._orders = known
+            self.dirty = False
+            for operation, args in self._replay:
+                operation(*args)
+            self._replay = None
+            self.ready = True
+            self.last_reconciled = time.time()
+        print(f"📊 Order stats reconciled from {len(rows)} orders in {time.time() - started:.2f}s")
+
+    def snapshot(self, agent=None):
+        """Dashboard stats, optionally for one confirmation agent"""
+        with self._lock:
+            cells = [(cell_agent, status, count, amount)
+                     for (cell_agent, status), (count, amount) in self._cells.items()
+                     if agent is None or cell_agent == agent]
+        return summarize_cells(cells)
+
+    def start(self):
+        """Reconcile in the background now and then every reconcile_interval seconds"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="order-stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                traceback.print_exc()
+                print(f"⚠️ Order stats reconcile failed: {e}")
+            self._stop.wait(self.min_interval)
+            self._wakeup.wait(max(0, self.reconcile_interval - self.min_interval))
+            self._wakeup.clear()
@@ -4,6 +4,8 @@ import numpy as np
 import uuid
 from PIL import Image, ImageDraw, ImageFont
 
+from waveform_sprites import get_bar_atlas
+
 # Define function from working_audio_api.py (simplified for test)
 def create_spotify_waveform_image(waveform_data, scan_id="TEST-ID-123"):
     """Create the Spotify-style waveform code image with vertical bars and ID text"""
@@ -21,6 +23,7 @@ def create_spotify_waveform_image(waveform_data, scan_id="TEST-ID-123"):
     # Calculate total width needed for bars
     total_bars_width = bar_count * (bar_width + bar_spacing) - bar_spacing
     start_x = (width - total_bars_width) // 2
+    atlas = get_bar_atlas(bar_width, min_height=4, max_height=max_bar_height)
     
     # Draw waveform bars (vertical bars like Spotify codes)
     for i, amplitude in enumerate(waveform_data):
@@ -31,18 +34,12 @@ def create_spotify_waveform_image(waveform_data, scan_id="TEST-ID-123"):
         # Center within the "waveform area" (top 160px)
         waveform_area_height = height - 60
         y_start = (waveform_area_height - bar_height) // 2
-        y_end = y_start + bar_height
         
         # Calculate x position
         x_start = start_x + i * (bar_width + bar_spacing)
-        x_end = x_start + bar_width
         
-        # Draw rounded rectangle for each bar (Spotify style)
-        corner_radius = min(bar_width // 2, (y_end - y_start) // 2)
-        if corner_radius <= 0:
-            draw.rectangle([x_start, y_start, x_end, y_end], fill='black')
-        else:
-            draw.rounded_rectangle([x_start, y_start, x_end, y_end], radius=corner_radius, fill='black')
+        # Paste the pre-rendered rounded bar (Spotify style), as the API does
+        atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
     
     # Draw ID text at the bottom
     try:
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+In-process lookups for the scan endpoints: an index of the newest audio-bearing
+order per frame (/api/scan/<frame_id>/) and a TTL cache of scan_id lookups
+(/api/audio/<scan_id>/), so repeated scans are served from memory.
+Both are kept current by the order create / update / delete paths.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def _frame_key(frame_id):
+    return str(frame_id)
+
+
+def _order_key(order):
+    order_id = order.get('id')
+    return str(order_id) if order_id is not None else f"scan:{order.get('scan_id')}"
+
+
+def is_scannable(order):
+    """An order can answer a scan once it has a frame and an audio file"""
+    return order.get('frame_id') is not None and bool(order.get('audio_file_url'))
+
+
+class FrameScanIndex:
+    """frame_id -> scannable orders, with the newest one (by created_at) cached.
+
+    A frame is fresh after its latest order was confirmed by Supabase (or
+    Supabase confirmed it has none) and stays fresh for fresh_ttl seconds, as
+    long as no update/delete touched it in a way the index cannot follow.
+    """
+
+    def __init__(self, fresh_ttl=300):
+        self.fresh_ttl = fresh_ttl
+        self._by_frame = {}
+        self._latest = {}
+        self._frame_of = {}
+        self._fresh_until = {}
+        self._lock = threading.RLock()
+
+    def rebuild(self, orders):
+        """Seed the index from a list of orders (e.g. the local persistence file)"""
+        with self._lock:
+            self._by_frame.clear()
+            self._latest.clear()
+            self._frame_of.clear()
+            self._fresh_until.clear()
+            for order in orders:
+                self._add(order)
+
+    def _add(self, order):
+        if not is_scannable(order):
+            return
+        frame = _frame_key(order['frame_id'])
+        key = _order_key(order)
+        self._by_frame.setdefault(frame, {})[key] = order
+        self._frame_of[key] = frame
+        current = self._latest.get(frame)
+        if current is None or order.get('created_at', '') >= current.get('created_at', ''):
+            self._latest[frame] = order
+
+    def _discard(self, key):
+        """Remove an order; returns the frame it was in, or None"""
+        frame = self._frame_of.pop(key, None)
+        if frame is None:
+            return None
+        candidates = self._by_frame[frame]
+        removed = candidates.pop(key)
+        if not candidates:
+            del self._by_frame[frame]
+            del self._latest[frame]
+        elif self._latest[frame] is removed:
+            self._latest[frame] = max(candidates.values(), key=lambda o: o.get('created_at', ''))
+        return frame
+
+    def upsert(self, order):
+        """Record a created or fully known updated order"""
+        with self._lock:
+            previous_frame = self._discard(_order_key(order))
+            # Losing an order may expose one Supabase has but the index never saw
+            if previous_frame is not None and (
+                    not is_scannable(order) or _frame_key(order['frame_id']) != previous_frame):
+                self._fresh_until.pop(previous_frame, None)
+            self._add(order)
+
+    def apply_updates(self, order_id, updates):
+        """Record a partial update (PUT body) for an order"""
+        with self._lock:
+            frame = self._frame_of.get(str(order_id))
+            if frame is not None:
+                order = dict(self._by_frame[frame][str(order_id)])
+                order.update(updates)
+                self.upsert(order)
+            elif 'frame_id' in updates:
+                self._fresh_until.pop(_frame_key(updates['frame_id']), None)
+            elif 'audio_file_url' in updates or 'created_at' in updates:
+                # Unknown order whose frame we cannot tell: re-verify every frame
+                self._fresh_until.clear()
+
+    def remove(self, order_id):
+        with self._lock:
+            frame = self._discard(str(order_id))
+            if frame is not None:
+                self._fresh_until.pop(frame, None)
+
+    def lookup(self, frame_id):
+        """Return (order or None, fresh)"""
+        frame = _frame_key(frame_id)
+        with self._lock:
+            fresh = self._fresh_until.get(frame, 0) > time.time()
+            return self._latest.get(frame), fresh
+
+    def store(self, frame_id, order):
+        """Merge Supabase's latest order for frame_id (None if it has none), mark the
+        frame fresh and return the newest known order"""
+        frame = _frame_key(frame_id)
+        with self._lock:
+            if order is not None:
+                self.upsert(order)
+            self._fresh_until[frame] = time.time() + self.fresh_ttl
+            return self._latest.get(frame)
+
+
+class ScanLookupCache:
+    """Bounded LRU of lookup key (scan_id or numeric id) -> response payload.
+
+    Found orders live for ttl seconds, unknown keys (payload None) for
+    negative_ttl seconds. Entries are also reachable through the order's id and
+    scan_id so invalidate() works with whichever identifier the caller has.
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30, max_entries=2048):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (hit, payload); payload is None for a cached miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, payload, _ = entry
+            if expires <= time.time():
+                self._pop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, payload
+
+    def put(self, key, payload, order=None):
+        aliases = {key}
+        if order:
+            aliases.update(str(v) for v in (order.get('id'), order.get('scan_id')) if v is not None)
+        ttl = self.ttl if payload is not None else self.negative_ttl
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.time() + ttl, payload, aliases)
+            for alias in aliases:
+                self._aliases.setdefault(alias, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for alias in entry[2]:
+            keys = self._aliases.get(alias)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._aliases[alias]
+
+    def invalidate(self, *identifiers):
+        """Drop every entry for these order ids / scan_ids (None values are ignored)"""
+        with self._lock:
+            for identifier in identifiers:
+                if identifier is None:
+                    continue
+                identifier = str(identifier)
+                for key in list(self._aliases.get(identifier, ())) + [identifier]:
+                    self._pop(key)
+
+    def __len__(self):
+        return len(self._entries)
@@ -15,7 +15,9 @@ from datetime import datetime
 from flask import Flask, request, jsonify
 from werkzeug.utils import secure_filename
 from io import BytesIO
-from PIL import Image, ImageDraw
+from PIL import Image
+from waveform_analysis import DEFAULT_BAR_COUNT, extract_bar_energies
+from waveform_sprites import get_bar_atlas
 
 # Cloudinary imports
 try:
@@ -210,7 +212,7 @@ def generate_spotify_waveform_code(audio_url, order_id):
         print(f"❌ Spotify waveform generation error: {e}")
         return generate_fallback_waveform(order_id)
 
-def analyze_audio_waveform(audio_data):
+def analyze_audio_waveform(audio_data, bar_count=DEFAULT_BAR_COUNT):
     """Analyze audio data and extract waveform information using librosa"""
     try:
         # Save audio data to temporary file
@@ -219,26 +221,7 @@ def analyze_audio_waveform(audio_data):
             y, sr = librosa.load(audio_buffer, sr=None)
             
             # Calculate RMS energy for each segment (Spotify-style analysis)
-            bar_count = 60  # Standard Spotify configuration
-            hop_length = len(y) // bar_count
-            waveform_data = []
-            
-            for i in range(bar_count):
-                start = i * hop_length
-                end = min((i + 1) * hop_length, len(y))
-                segment = y[start:end]
-                
-                if len(segment) > 0:
-                    # Calculate RMS energy and normalize
-                    rms = np.sqrt(np.mean(segment**2))
-                    # Apply logarithmic scaling for better visual representation
-                    normalized_rms = np.log1p(rms * 10) / np.log1p(1.0)
-                    normalized_rms = min(1.0, normalized_rms)
-                    waveform_data.append(normalized_rms)
-                else:
-                    waveform_data.append(0.1)  # Minimum height
-            
-            return np.array(waveform_data)
+            return extract_bar_energies(y, bar_count)
             
     except Exception as e:
         print(f"⚠️  Audio analysis failed, using fallback: {e}")
@@ -290,7 +273,7 @@ def create_spotify_waveform_image(waveform_data):
     
     # Create white background (Spotify style)
     image = Image.new('RGB', (width, height), 'white')
-    draw = ImageDraw.Draw(image)
+    atlas = get_bar_atlas(bar_width, min_height=4, max_height=max_bar_height)
     
     # Calculate total width needed for bars
     total_bars_width = bar_count * (bar_width + bar_spacing) - bar_spacing
@@ -303,18 +286,12 @@ def create_spotify_waveform_image(waveform_data):
         
         # Center the bar vertically
         y_start = (height - bar_height) // 2
-        y_end = y_start + bar_height
         
         # Calculate x position
         x_start = start_x + i * (bar_width + bar_spacing)
-        x_end = x_start + bar_width
         
-        # Draw rounded rectangle for each bar (Spotify style)
-        corner_radius = min(bar_width // 2, (y_end - y_start) // 2)
-        if corner_radius <= 0:
-            draw.rectangle([x_start, y_start, x_end, y_end], fill='black')
-        else:
-            draw.rounded_rectangle([x_start, y_start, x_end, y_end], radius=corner_radius, fill='black')
+        # Paste the pre-rendered rounded bar (Spotify style)
+        atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
     
     # Convert to bytes
     img_byte_arr = BytesIO()
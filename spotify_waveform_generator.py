@@ -10,8 +10,11 @@ import os
 import requests
 import numpy as np
 import librosa
-from PIL import Image, ImageDraw
+from PIL import Image
 import logging
+from waveform_analysis import extract_bar_energies
+from waveform_sprites import get_bar_atlas
+from waveform_svg import render_svg
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +32,8 @@ class SpotifyWaveformCodeGenerator:
         self.bar_spacing = bar_spacing
         self.max_bar_height = height - 40  # Leave 20px margin top/bottom
         
-    def generate_spotify_waveform_code(self, audio_url: str, output_name: str, save_local: bool = True) -> str:
+    def generate_spotify_waveform_code(self, audio_url: str, output_name: str, save_local: bool = True,
+                                       image_format: str = "png") -> str:
         """
         Downloads audio file and generates authentic Spotify-style waveform code.
         
@@ -37,6 +41,7 @@ class SpotifyWaveformCodeGenerator:
             audio_url: URL of the audio file to analyze
             output_name: Name for the generated image file
             save_local: Whether to save the image locally
+            image_format: "png" or "svg"
             
         Returns:
             str: Local file path or URL of the generated waveform code
@@ -49,11 +54,14 @@ class SpotifyWaveformCodeGenerator:
             waveform_data = self._analyze_audio_waveform(audio_data)
             
             # Step 3: Generate Spotify-style waveform code image
-            image_bytes = self._create_spotify_waveform_image(waveform_data)
+            if image_format == "svg":
+                image_bytes = self._create_spotify_waveform_svg(waveform_data).encode("utf-8")
+            else:
+                image_bytes = self._create_spotify_waveform_image(waveform_data)
             
             # Step 4: Save locally
             if save_local:
-                filename = f"{output_name}.png"
+                filename = f"{output_name}.{image_format}"
                 with open(filename, "wb") as f:
                     f.write(image_bytes)
                 
@@ -84,25 +92,7 @@ class SpotifyWaveformCodeGenerator:
                 y, sr = librosa.load(audio_buffer, sr=None)
                 
                 # Calculate RMS energy for each segment (Spotify-style analysis)
-                hop_length = len(y) // self.bar_count
-                waveform_data = []
-                
-                for i in range(self.bar_count):
-                    start = i * hop_length
-                    end = min((i + 1) * hop_length, len(y))
-                    segment = y[start:end]
-                    
-                    if len(segment) > 0:
-                        # Calculate RMS energy and normalize
-                        rms = np.sqrt(np.mean(segment**2))
-                        # Apply logarithmic scaling for better visual representation
-                        normalized_rms = np.log1p(rms * 10) / np.log1p(1.0)
-                        normalized_rms = min(1.0, normalized_rms)
-                        waveform_data.append(normalized_rms)
-                    else:
-                        waveform_data.append(0.1)  # Minimum height
-                
-                return np.array(waveform_data)
+                return extract_bar_energies(y, self.bar_count)
                 
         except Exception as e:
             logger.warning(f"Audio analysis failed, using fallback: {str(e)}")
@@ -148,7 +138,7 @@ class SpotifyWaveformCodeGenerator:
         """Create the Spotify-style waveform code image with vertical bars."""
         # Create white background (Spotify style)
         image = Image.new('RGB', (self.width, self.height), 'white')
-        draw = ImageDraw.Draw(image)
+        atlas = get_bar_atlas(self.bar_width, min_height=4, max_height=self.max_bar_height)
         
         # Calculate total width needed for bars
         total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
@@ -161,14 +151,12 @@ class SpotifyWaveformCodeGenerator:
             
             # Center the bar vertically
             y_start = (self.height - bar_height) // 2
-            y_end = y_start + bar_height
             
             # Calculate x position
             x_start = start_x + i * (self.bar_width + self.bar_spacing)
-            x_end = x_start + self.bar_width
             
-            # Draw rounded rectangle for each bar (Spotify style)
-            self._draw_spotify_bar(draw, x_start, y_start, x_end, y_end, 'black')
+            # Paste the pre-rendered rounded bar (Spotify style)
+            atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
         
         # Convert to bytes
         img_byte_arr = io.BytesIO()
@@ -176,18 +164,16 @@ class SpotifyWaveformCodeGenerator:
         img_byte_arr.seek(0)
         
         return img_byte_arr.getvalue()
-    
-    def _draw_spotify_bar(self, draw, x1, y1, x2, y2, fill):
-        """Draw a rounded rectangle bar in Spotify style."""
-        # Calculate corner radius (smaller of width/2 or height/2)
-        corner_radius = min(self.bar_width // 2, (y2 - y1) // 2)
-        
-        if corner_radius <= 0:
-            # Draw regular rectangle if too small for rounded corners
-            draw.rectangle([x1, y1, x2, y2], fill=fill)
-        else:
-            # Draw rounded rectangle (Spotify style)
-            draw.rounded_rectangle([x1, y1, x2, y2], radius=corner_radius, fill=fill)
+
+    def _create_spotify_waveform_svg(self, waveform_data: np.ndarray) -> str:
+        """Same bars as _create_spotify_waveform_image, as an SVG document."""
+        total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
+        start_x = (self.width - total_bars_width) // 2
+        bars = []
+        for i, amplitude in enumerate(waveform_data):
+            bar_height = max(4, int(amplitude * self.max_bar_height))
+            bars.append((start_x + i * (self.bar_width + self.bar_spacing), (self.height - bar_height) // 2, bar_height))
+        return render_svg(bars, self.width, self.height, self.bar_width)
 
 def test_spotify_waveform_generation():
     """Test Spotify waveform generation with different configurations"""
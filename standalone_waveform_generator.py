@@ -9,8 +9,10 @@ import os
 import requests
 import numpy as np
 import librosa
-from PIL import Image, ImageDraw
+from PIL import Image
 import logging
+from waveform_sprites import get_bar_atlas
+from waveform_svg import render_svg
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +29,8 @@ class SpotifyWaveformGenerator:
         self.bar_spacing = bar_spacing
         self.max_bar_height = height - 40  # Leave 20px margin top/bottom
         
-    def generate_waveform_code(self, audio_url: str, output_name: str, save_local: bool = True) -> str:
+    def generate_waveform_code(self, audio_url: str, output_name: str, save_local: bool = True,
+                               image_format: str = "png") -> str:
         """
         Downloads audio file, generates waveform code image.
         
@@ -35,6 +38,7 @@ class SpotifyWaveformGenerator:
             audio_url: URL of the audio file to analyze
             output_name: Name for the generated image file
             save_local: Whether to save the image locally
+            image_format: "png" or "svg"
             
         Returns:
             str: Local file path or URL of the generated waveform image
@@ -47,11 +51,14 @@ class SpotifyWaveformGenerator:
             waveform_data = self._analyze_audio_waveform(audio_data)
             
             # Step 3: Generate waveform image
-            image_bytes = self._create_waveform_image(waveform_data)
+            if image_format == "svg":
+                image_bytes = self._create_waveform_svg(waveform_data).encode("utf-8")
+            else:
+                image_bytes = self._create_waveform_image(waveform_data)
             
             # Step 4: Save locally
             if save_local:
-                filename = f"{output_name}.png"
+                filename = f"{output_name}.{image_format}"
                 with open(filename, "wb") as f:
                     f.write(image_bytes)
                 
@@ -128,7 +135,7 @@ class SpotifyWaveformGenerator:
         """Create the waveform code image."""
         # Create white background
         image = Image.new('RGB', (self.width, self.height), 'white')
-        draw = ImageDraw.Draw(image)
+        atlas = get_bar_atlas(self.bar_width, min_height=4, max_height=self.max_bar_height)
         
         # Calculate total width needed for bars
         total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
@@ -141,14 +148,12 @@ class SpotifyWaveformGenerator:
             
             # Center the bar vertically
             y_start = (self.height - bar_height) // 2
-            y_end = y_start + bar_height
             
             # Calculate x position
             x_start = start_x + i * (self.bar_width + self.bar_spacing)
-            x_end = x_start + self.bar_width
             
-            # Draw rounded rectangle for each bar
-            self._draw_rounded_bar(draw, x_start, y_start, x_end, y_end, 'black')
+            # Paste the pre-rendered rounded bar
+            atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
         
         # Convert to bytes
         img_byte_arr = io.BytesIO()
@@ -156,18 +161,16 @@ class SpotifyWaveformGenerator:
         img_byte_arr.seek(0)
         
         return img_byte_arr.getvalue()
-    
-    def _draw_rounded_bar(self, draw, x1, y1, x2, y2, fill):
-        """Draw a rounded rectangle bar."""
-        # Calculate corner radius (smaller of width/2 or height/2)
-        corner_radius = min(self.bar_width // 2, (y2 - y1) // 2)
-        
-        if corner_radius <= 0:
-            # Draw regular rectangle if too small for rounded corners
-            draw.rectangle([x1, y1, x2, y2], fill=fill)
-        else:
-            # Draw rounded rectangle
-            draw.rounded_rectangle([x1, y1, x2, y2], radius=corner_radius, fill=fill)
+
+    def _create_waveform_svg(self, waveform_data: np.ndarray) -> str:
+        """Same bars as _create_waveform_image, as an SVG document."""
+        total_bars_width = self.bar_count * (self.bar_width + self.bar_spacing) - self.bar_spacing
+        start_x = (self.width - total_bars_width) // 2
+        bars = []
+        for i, amplitude in enumerate(waveform_data):
+            bar_height = max(4, int(amplitude * self.max_bar_height))
+            bars.append((start_x + i * (self.bar_width + self.bar_spacing), (self.height - bar_height) // 2, bar_height))
+        return render_svg(bars, self.width, self.height, self.bar_width)
 
 def test_waveform_generation():
     """Test waveform generation with different configurations"""
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Shared, connection-pooled clients for Supabase (PostgREST + Storage) and other
+outbound HTTP such as Cloudinary audio downloads.
+One keep-alive requests.Session per destination avoids a TCP + TLS handshake
+on every call; every request gets a default timeout.
+A CircuitBreaker in front of Supabase fails calls fast while it is down.
+"""
+
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+DEFAULT_POOL_SIZE = 10
+
+
+class PooledHTTPClient:
+    """Thin wrapper over a keep-alive requests.Session with bounded pools,
+    default headers and a default timeout. Call signatures match requests.*
+    With a breaker, every request goes through breaker.call()"""
+
+    def __init__(self, headers=None, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE, breaker=None):
+        self.timeout = timeout
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if self.breaker is not None:
+            return self.breaker.call(self.session.request, method, url, **kwargs)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a service whose circuit is open"""
+
+
+class SupabaseHTTPError(Exception):
+    """Supabase answered, but with an error status (the request itself was rejected)"""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by every call to one service.
+
+    Each call's outcome goes into a rolling window; a call fails if it raises
+    one of `failures`, returns a 5xx response, or takes longer than
+    slow_call seconds. The circuit opens after failure_threshold consecutive
+    failures, or when at least failure_threshold of the last `window` calls
+    were made and failure_rate of them failed. While open, calls raise
+    CircuitOpenError at once so callers fall back to local data.
+
+    Opening starts a background thread that waits open_seconds, goes
+    half-open and runs probe() (which must bypass the breaker); a True result
+    closes the circuit, anything else re-opens it for another open_seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, probe=None, failure_threshold=5, window=20, failure_rate=0.5,
+                 slow_call=5.0, open_seconds=30, failures=(Exception,)):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.failures = failures
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.last_error = None
+        self._outcomes = deque(maxlen=window)
+        self._consecutive = 0
+        self._latency = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def allow(self):
+        """True when calls may go through (the circuit is closed)"""
+        return self.state == self.CLOSED
+
+    def call(self, func, *args, **kwargs):
+        return self.call_with(self.failures, func, *args, **kwargs)
+
+    def call_with(self, failures, func, *args, **kwargs):
+        """call() counting a different set of exceptions as failures (e.g. the httpx
+        transport errors of client libraries that do not use requests)"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is {self.state} ({self.last_error})")
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except failures as e:
+            self.record(False, time.monotonic() - started, e)
+            raise
+        elapsed = time.monotonic() - started
+        status = getattr(result, "status_code", None)
+        if status is not None and status >= 500:
+            self.record(False, elapsed, f"HTTP {status}")
+        else:
+            self.record(True, elapsed)
+        return result
+
+    def record(self, ok, elapsed=0.0, error=None):
+        """Record one call's outcome (for calls not made through call())"""
+        if ok and elapsed > self.slow_call:
+            ok, error = False, f"slow call ({elapsed:.1f}s)"
+        with self._lock:
+            # Exponential moving average, reported by status()
+            self._latency = elapsed if self._latency is None else 0.8 * self._latency + 0.2 * elapsed
+            if self.state != self.CLOSED:
+                return
+            self._outcomes.append(ok)
+            if ok:
+                self._consecutive = 0
+                return
+            self._consecutive += 1
+            self.last_error = str(error)
+            failed = self._outcomes.count(False)
+            if (self._consecutive >= self.failure_threshold or
+                    (len(self._outcomes) >= self.failure_threshold and
+                     failed >= self.failure_rate * len(self._outcomes))):
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        print(f"🔌 {self.name} circuit OPEN after {self._consecutive} consecutive failures "
+              f"({self.last_error}); serving local data, probing every {self.open_seconds}s")
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._probe_loop, name=f"{self.name}-breaker-probe", daemon=True)
+            self._thread.start()
+
+    def _close(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.opened_at = None
+            self._outcomes.clear()
+            self._consecutive = 0
+        print(f"✅ {self.name} circuit CLOSED, service reachable again")
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.open_seconds):
+            with self._lock:
+                self.state = self.HALF_OPEN
+            try:
+                healthy = self.probe() if self.probe else True
+            except Exception as e:
+                healthy = False
+                self.last_error = str(e)
+            if healthy:
+                self._close()
+                return
+            with self._lock:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+            print(f"🔌 {self.name} still unavailable ({self.last_error}), circuit stays open")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self):
+        """State and recent numbers, for health checks"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "opened_at": self.opened_at,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": self._outcomes.count(False),
+                "avg_latency_ms": round(self._latency * 1000, 1) if self._latency is not None else None,
+                "last_error": self.last_error
+            }
+
+
+class SupabaseClientProvider:
+    """Lazily creates one supabase-py Client per process and hands it out,
+    instead of calling create_client() (and opening new connections) per request"""
+
+    def __init__(self, url, key, create_client):
+        self.url = url
+        self.key = key
+        self._create_client = create_client
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client(self.url, self.key)
+                    print(f"✅ Supabase client initialized")
+                    print(f"   URL: {self.url}")
+        return self._client
+
+    def reset(self):
+        """Drop the cached client so the next call reconnects (e.g. after a network error)"""
+        with self._lock:
+            self._client = None
+
+
+class StorageUploadAuditor:
+    """Opt-in background check that recently uploaded Storage objects exist.
+
+    Uploads only record their filename; every `interval` seconds a single
+    batched list call (list_recent(limit) -> names) is compared against the
+    recorded names, so no request ever waits on a bucket listing.
+    """
+
+    def __init__(self, list_recent, interval=300, max_pending=500):
+        self._list_recent = list_recent
+        self.interval = interval
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, filename):
+        with self._lock:
+            self._pending.append(filename)
+
+    def audit_once(self):
+        """Check the recorded filenames against one listing; returns the missing names"""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        if not pending:
+            return []
+        try:
+            listed = set(self._list_recent(max(len(pending) * 2, 100)))
+        except Exception as e:
+            print(f"⚠️  Storage audit listing failed: {e}")
+            with self._lock:
+                self._pending.extendleft(reversed(pending))
+            return []
+        missing = [name for name in pending if name not in listed]
+        if missing:
+            print(f"⚠️  Storage audit: {len(missing)}/{len(pending)} uploads not found in bucket: {missing[:5]}")
+        else:
+            print(f"✅ Storage audit: {len(pending)} recent uploads verified")
+        return missing
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="storage-auditor", daemon=True)
+        self._thread.start()
+        print(f"✅ Storage upload auditor started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.audit_once()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the Supabase circuit breaker (supabase_client.CircuitBreaker)
+"""
+
+import time
+
+import requests
+
+from supabase_client import CircuitBreaker, CircuitOpenError
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def failing():
+    raise requests.exceptions.ConnectionError("connection refused")
+
+
+def expect_open(breaker):
+    started = time.monotonic()
+    try:
+        breaker.call(FakeResponse, 200)
+    except CircuitOpenError:
+        assert time.monotonic() - started < 0.1
+        return
+    raise AssertionError("call went through an open circuit")
+
+
+def test_opens_and_recovers():
+    """Consecutive failures open the circuit; a successful probe closes it"""
+    print("🔌 Tripping the breaker")
+    healthy = []
+    breaker = CircuitBreaker("test", probe=lambda: bool(healthy), failure_threshold=3,
+                             open_seconds=0.05, failures=(requests.exceptions.RequestException,))
+    assert breaker.call(FakeResponse, 200).status_code == 200
+    for _ in range(3):
+        try:
+            breaker.call(failing)
+        except requests.exceptions.ConnectionError:
+            pass
+    assert breaker.state != CircuitBreaker.CLOSED
+    expect_open(breaker)
+
+    time.sleep(0.15)  # probes keep failing
+    assert not breaker.allow()
+    healthy.append(True)
+    for _ in range(50):
+        if breaker.allow():
+            break
+        time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.call(FakeResponse, 200).status_code == 200
+    breaker.stop()
+    print("✅ Breaker opened and recovered")
+
+
+def test_server_errors_and_slow_calls_count():
+    """5xx responses and slow calls are failures; 4xx responses are not"""
+    breaker = CircuitBreaker("test", probe=lambda: False, failure_threshold=3, slow_call=0.01, open_seconds=60)
+    for _ in range(5):
+        breaker.call(FakeResponse, 404)
+    assert breaker.allow()
+    breaker.call(FakeResponse, 503)
+    breaker.record(True, elapsed=1.0)
+    breaker.call(FakeResponse, 500)
+    assert not breaker.allow()
+    status = breaker.status()
+    assert status["state"] != CircuitBreaker.CLOSED and status["recent_failures"] == 3
+    assert "HTTP 500" in status["last_error"]
+    expect_open(breaker)
+    breaker.stop()
+    print("✅ 5xx and slow calls trip the breaker")
+
+
+if __name__ == "__main__":
+    test_opens_and_recovers()
+    test_server_errors_and_slow_calls_count()
+    print("🎉 All circuit breaker tests passed")
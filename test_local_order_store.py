@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite local order store (local_order_store.py)
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+from local_order_store import LocalOrderStore
+from order_pagination import sort_key
+from order_stats import summarize_cells
+
+
+def make_order(order_id, **fields):
+    order = {"id": order_id, "scan_id": f"SCAN{order_id}", "frame_id": 1, "status": "pending",
+             "confirmation_agent": "", "customer_name": f"Customer {order_id}",
+             "customer_phone": f"0555{order_id:06d}", "created_at": f"2024-01-01T00:00:{order_id % 60:02d}"}
+    order.update(fields)
+    return order
+
+
+def test_lookups_and_filters():
+    """id lookups ignore int/str differences and filters use the indexed columns"""
+    print("🗄️  Querying the local order store")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        for i in range(1, 6):
+            store.upsert(make_order(i, status="confirmed" if i % 2 else "pending",
+                                    confirmation_agent="amina" if i < 3 else "karim"))
+
+        assert store.get("3")["id"] == 3
+        assert store.find("SCAN4")["id"] == 4
+        assert store.find("2")["scan_id"] == "SCAN2"
+        assert [o["id"] for o in store.query(status="confirmed")] == [5, 3, 1]
+        assert store.count(agent="amina") == 2
+        assert [o["id"] for o in store.query(search="customer 4")] == [4]
+        assert len(store.query(limit=2)) == 2
+
+        assert store.update(3, {"status": "shipped"})["status"] == "shipped"
+        assert store.update_by_scan_id("SCAN1", {"qr_code_url": "u"})["qr_code_url"] == "u"
+        assert store.update(99, {"status": "shipped"}) is None
+        assert store.delete(5) and not store.delete(5)
+        assert store.count() == 4
+
+        shipped = store.update_many([1, "2", 99], {"status": "shipped", "confirmation_agent": "amina"})
+        assert sorted(o["id"] for o in shipped) == [1, 2]
+        assert store.count(status="shipped", agent="amina") == 2
+    print("✅ Lookups, filters, updates and deletes work")
+
+
+def test_import_once_and_concurrent_updates():
+    """The legacy import runs once and concurrent writers never lose updates"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "orders.sqlite3")
+        store = LocalOrderStore(path)
+        assert store.import_orders([make_order(1)], marker="legacy") == 1
+        assert LocalOrderStore(path).import_orders([make_order(2)], marker="legacy") == 0
+        assert store.count() == 1
+
+        def bump(worker):
+            other = LocalOrderStore(path)
+            for n in range(20):
+                other.update(1, {f"w{worker}_{n}": True})
+
+        threads = [threading.Thread(target=bump, args=(w,)) for w in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len([k for k in store.get(1) if k.startswith("w")]) == 60
+    print("✅ Import marker and concurrent updates hold")
+
+
+def test_grouped_stats():
+    """The SQL grouping gives the dashboard numbers the Python pass used to compute"""
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        store.upsert(make_order(1, status="shipped", confirmation_agent="amina", total_amount="3,500"))
+        store.upsert(make_order(2, status="shipped", confirmation_agent="karim", total_amount=4000))
+        store.upsert(make_order(3, status="confirmed", confirmation_agent="amina", total_amount=None))
+        stats = summarize_cells(store.grouped_stats())
+        assert stats == {"total_orders": 3, "confirmed_orders": 1, "shipped_orders": 2,
+                         "total_revenue": 7500.0, "agent_stats": {"amina": 1}}
+        assert summarize_cells(store.grouped_stats(agent="karim"))["total_revenue"] == 4000.0
+    print("✅ Grouped stats match")
+
+
+def test_keyset_with_canonical_cursor():
+    """A cursor built from a merged page ("...000000") still pages through local orders
+    stored without fractional seconds, including ones saved before the column was canonical"""
+    print("🔑 Paging local orders with a canonical cursor")
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "orders.sqlite3")
+        store = LocalOrderStore(path)
+        for i in range(1, 5):
+            store.upsert(make_order(i, created_at="2024-05-01T10:00:00"))
+        store.upsert(make_order(5, created_at="2024-05-01T09:00:00+00:00"))
+        # A row written by an older version, before created_at was canonicalized
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE local_orders SET created_at = '2024-05-01T10:00:00' WHERE id = '2'")
+        conn.execute("DELETE FROM local_store_meta WHERE key = 'canonical_created_at'")
+        conn.commit()
+        conn.close()
+        store = LocalOrderStore(path)
+
+        after = sort_key(store.get(3))
+        assert after == ("2024-05-01T10:00:00.000000", 3)
+        assert [o["id"] for o in store.query(after=after)] == [2, 1, 5]
+        assert [o["id"] for o in store.query(after=("2024-05-01T10:00:00", 3))] == [2, 1, 5]
+        assert [o["id"] for o in store.iter_query(chunk_size=2)] == [4, 3, 2, 1, 5]
+        assert store.count(created_from="2024-05-01T10:00:00+00:00") == 4
+    print("✅ Local cursors compare in canonical form")
+
+
+if __name__ == "__main__":
+    test_lookups_and_filters()
+    test_import_once_and_concurrent_updates()
+    test_grouped_stats()
+    test_keyset_with_canonical_cursor()
+    print("🎉 All local order store tests passed!")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Test the legacy local order backup reader (order_journal.py)
+"""
+
+import json
+import os
+import tempfile
+
+from order_journal import OrderJournal
+
+
+def test_replay_over_snapshot():
+    """Upserts and deletes in the journal are applied on top of the snapshot"""
+    print("📜 Replaying journal over snapshot")
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "orders.json"), "w") as f:
+            json.dump([{"id": 1, "status": "pending"}, {"id": 2, "status": "pending"}], f)
+        journal_path = os.path.join(root, "orders.jsonl")
+        with open(journal_path, "w") as f:
+            for entry in ({"op": "upsert", "order": {"id": 1, "status": "confirmed"}},
+                          {"op": "upsert", "order": {"id": 3, "status": "pending"}},
+                          {"op": "delete", "id": "2"}):
+                f.write(json.dumps(entry) + "\n")
+            f.write('{"op": "upsert", "order": {"id": 4')  # torn write
+
+        orders = OrderJournal(os.path.join(root, "orders.json"), journal_path).load()
+        assert [(o["id"], o["status"]) for o in orders] == [(1, "confirmed"), (3, "pending")]
+        assert OrderJournal(os.path.join(root, "missing.json"), os.path.join(root, "missing.jsonl")).load() == []
+    print("✅ Journal replayed")
+
+
+if __name__ == "__main__":
+    test_replay_over_snapshot()
+    print("🎉 All order journal tests passed!")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test the outbox replay of locally saved orders (order_outbox.py)
+"""
+
+import os
+import tempfile
+
+from local_order_store import LocalOrderStore
+from order_outbox import OrderOutbox
+
+
+def make_order(order_id, second, **fields):
+    order = {"id": order_id, "scan_id": f"SCAN{order_id}", "status": "pending",
+             "created_at": f"2024-05-01T10:00:{second:02d}", "supabase_error": True}
+    order.update(fields)
+    return order
+
+
+class Rejected(Exception):
+    """A 4xx from PostgREST for the pushed rows"""
+
+
+class FakeApiOrder:
+    """api_order keyed by scan_id, like the upsert with on_conflict=scan_id"""
+
+    def __init__(self):
+        self.rows = {}
+        self.batches = []
+        self.fail = False
+        self.poison = set()
+
+    def push(self, orders):
+        if self.fail:
+            raise Exception("503 - unavailable")
+        if any(o["scan_id"] in self.poison for o in orders):
+            raise Rejected("400 - invalid input syntax for type numeric")
+        self.batches.append([o["scan_id"] for o in orders])
+        for order in orders:
+            row = self.rows.setdefault(order["scan_id"], {"id": 9000 + len(self.rows)})
+            row.update({k: v for k, v in order.items() if k not in ("id", "supabase_error")})
+        return [dict(row) for row in self.rows.values() if row["scan_id"] in {o["scan_id"] for o in orders}]
+
+    def patch(self, order_ids, changes):
+        """PATCH api_order?id=in.(...): only the given columns change"""
+        if self.fail:
+            raise Exception("503 - unavailable")
+        if changes.get("status") in self.poison:
+            raise Rejected("400 - invalid status")
+        self.batches.append(("patch", sorted(order_ids)))
+        for row in self.rows.values():
+            if str(row["id"]) in order_ids:
+                row.update(changes)
+
+
+def test_replay_in_batches():
+    """Unsynced orders are pushed oldest first, re-keyed and leave the outbox"""
+    print("📤 Replaying local orders")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        for i in range(5):
+            store.upsert(make_order(100 + i, 5 - i))
+        store.upsert(make_order(200, 9, supabase_error=False))
+        cloud = FakeApiOrder()
+        synced = []
+        outbox = OrderOutbox(store, cloud.push, on_synced=lambda old, new: synced.append((old["id"], new["id"])),
+                             batch_size=2)
+
+        cloud.fail = True
+        try:
+            outbox.sync_once()
+            raise AssertionError("push failure should propagate")
+        except Exception as e:
+            assert "503" in str(e)
+        assert len(store.unsynced()) == 5
+
+        cloud.fail = False
+        assert outbox.sync_once() == 5
+        assert cloud.batches[0] == ["SCAN104", "SCAN103"]
+        assert store.unsynced() == [] and store.count(unsynced_only=True) == 0
+        assert store.get(104) is None and store.get_by_scan_id("SCAN104")["id"] == cloud.rows["SCAN104"]["id"]
+        assert len(synced) == 5 and store.count() == 6
+
+        # A replay of already synced orders is a no-op upsert
+        cloud.push([store.get_by_scan_id("SCAN100")])
+        assert len(cloud.rows) == 5
+    print("✅ Outbox replayed every order once")
+
+
+def test_changed_while_pushing_stays_queued():
+    """An order edited during its push is re-keyed but replayed again"""
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        store.upsert(make_order(1, 1))
+        cloud = FakeApiOrder()
+
+        def push_then_edit(orders):
+            rows = cloud.push(orders)
+            if len(cloud.batches) == 1:
+                store.update(1, {"status": "confirmed"})
+            return rows
+
+        outbox = OrderOutbox(store, push_then_edit)
+        assert outbox.sync_once() == 1
+        assert store.unsynced() == []
+        assert cloud.rows["SCAN1"]["status"] == "confirmed"
+        assert len(cloud.batches) == 2
+    print("✅ Concurrent edit replayed")
+
+
+def test_poison_row_is_deferred():
+    """A row Supabase rejects is deferred with a backoff instead of blocking the rows behind it"""
+    print("☠️  Replaying past a rejected row")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        store.upsert(make_order(1, 1, total_amount="N/A"))  # oldest: first in every batch
+        for i in range(2, 6):
+            store.upsert(make_order(i, i))
+        cloud = FakeApiOrder()
+        cloud.poison.add("SCAN1")
+        outbox = OrderOutbox(store, cloud.push, batch_size=2, is_rejected=lambda e: isinstance(e, Rejected),
+                             retry_base=60)
+
+        assert outbox.sync_once() == 4
+        assert sorted(cloud.rows) == ["SCAN2", "SCAN3", "SCAN4", "SCAN5"]
+        assert outbox.deferred_total == 1 and store.unsynced() == []
+        poisoned = store.get_by_scan_id("SCAN1")
+        assert poisoned["supabase_error"] and poisoned["outbox_attempts"] == 1
+        assert "400" in poisoned["outbox_error"] and store.count(unsynced_only=True) == 1
+
+        # Due again after the backoff; a second rejection doubles it
+        due = poisoned["outbox_retry_at"] + 1
+        assert [o["scan_id"] for o in store.unsynced(now=due)] == ["SCAN1"]
+        outbox._push(store.unsynced(now=due))
+        again = store.get_by_scan_id("SCAN1")
+        assert again["outbox_attempts"] == 2 and again["outbox_retry_at"] - poisoned["outbox_retry_at"] > 60
+
+        # Once fixed it syncs and the bookkeeping is cleared
+        cloud.poison.clear()
+        rows, _ = outbox._push([again])
+        synced = store.mark_synced(again, rows[0]["id"])
+        assert not any(field in synced for field in ("supabase_error", "outbox_error", "outbox_retry_at"))
+
+        # Outages still propagate and defer nothing
+        store.upsert(make_order(6, 6))
+        cloud.fail = True
+        try:
+            outbox.sync_once()
+            raise AssertionError("outage should propagate")
+        except Exception as e:
+            assert "503" in str(e)
+        assert outbox.deferred_total == 2 and len(store.unsynced()) == 1
+    print("✅ Rejected row deferred, the rest replayed")
+
+
+def test_pending_patch_replayed_by_id():
+    """Synced orders changed offline replay only the changed columns, keeping newer cloud data"""
+    print("🩹 Replaying offline status changes as patches")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        cloud = FakeApiOrder()
+        for i in range(1, 5):
+            store.upsert(make_order(9000 + i - 1, i, supabase_error=False, qr_code_url="old.png"))
+            cloud.rows[f"SCAN{9000 + i - 1}"] = {"id": 9000 + i - 1, "scan_id": f"SCAN{9000 + i - 1}",
+                                                 "status": "pending", "qr_code_url": "regenerated.png"}
+        store.update_many([9000, 9001, 9002], {"status": "shipped"}, queue_patch=True)
+        store.update(9000, {"confirmation_agent": "amina"}, queue_patch=True)
+        store.update(9003, {"status": "lost"}, queue_patch=True)
+        assert store.get(9000)["pending_patch"] == {"status": "shipped", "confirmation_agent": "amina"}
+        assert store.unsynced() == [] and len(store.pending_patches()) == 4
+
+        cloud.poison.add("lost")
+        outbox = OrderOutbox(store, cloud.push, patch_batch=cloud.patch, is_rejected=lambda e: isinstance(e, Rejected))
+        assert outbox.sync_once() == 3
+        assert ("patch", ["9001", "9002"]) in cloud.batches and not any(b[0] != "patch" for b in cloud.batches)
+        assert cloud.rows["SCAN9000"] == {"id": 9000, "scan_id": "SCAN9000", "status": "shipped",
+                                          "qr_code_url": "regenerated.png", "confirmation_agent": "amina"}
+        assert "pending_patch" not in store.get(9001)
+        assert store.get(9003)["outbox_attempts"] == 1 and store.pending_patches() == []
+    print("✅ Offline changes patched by id")
+
+
+if __name__ == "__main__":
+    test_replay_in_batches()
+    test_changed_while_pushing_stays_queued()
+    test_poison_row_is_deferred()
+    test_pending_patch_replayed_by_id()
+    print("🎉 All order outbox tests passed")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination helpers for /api/orders/ (order_pagination.py)
+"""
+
+import os
+import tempfile
+
+from local_order_store import LocalOrderStore
+from order_pagination import canonical_created_at, decode_cursor, encode_cursor, merge_pages
+
+
+def make_order(order_id, second, **fields):
+    order = {"id": order_id, "created_at": f"2024-05-01T10:00:{second:02d}.000001"}
+    order.update(fields)
+    return order
+
+
+def test_canonical_timestamps():
+    """Supabase and local timestamp formats sort on the same scale"""
+    assert canonical_created_at("2024-05-01T10:00:00.12345+00:00") == "2024-05-01T10:00:00.123450"
+    assert canonical_created_at("2024-05-01T12:00:00+02:00") == "2024-05-01T10:00:00.000000"
+    assert canonical_created_at("2024-05-01T10:00:00.123450") == "2024-05-01T10:00:00.123450"
+    print("✅ Timestamps normalized")
+
+
+def test_merge_walks_every_order_once():
+    """Paging cloud + local sources with cursors returns every order exactly once"""
+    print("📄 Paging through merged sources")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        for i in range(0, 40, 3):
+            store.upsert(make_order(1000 + i, i, supabase_error=True))
+        cloud = sorted([make_order(i, i) for i in range(40) if i % 3],
+                       key=lambda o: (o["created_at"], o["id"]), reverse=True)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            after = decode_cursor(cursor) if cursor else None
+            cloud_page = [o for o in cloud if not after or
+                          (canonical_created_at(o["created_at"]), o["id"]) < after][:8]
+            local_page = store.query(limit=8, after=after, unsynced_only=True)
+            page, cursor = merge_pages([cloud_page, local_page], 7)
+            seen.extend(o["id"] for o in page)
+            pages += 1
+            if not cursor:
+                break
+        assert pages == 6
+        assert len(seen) == len(set(seen)) == 40
+        assert [o % 1000 for o in seen] == list(range(39, -1, -1))
+    print("✅ Every order returned once, newest first")
+
+
+def test_cursor_round_trip_and_dedupe():
+    """Cursors are opaque but round-trip, and repeated ids are dropped"""
+    order = make_order(7, 5)
+    assert decode_cursor(encode_cursor(order)) == ("2024-05-01T10:00:05.000001", 7)
+    page, cursor = merge_pages([[order], [dict(order)]], 5)
+    assert len(page) == 1 and cursor is None
+    print("✅ Cursor round trip and dedupe")
+
+
+if __name__ == "__main__":
+    test_canonical_timestamps()
+    test_merge_walks_every_order_once()
+    test_cursor_round_trip_and_dedupe()
+    print("🎉 All order pagination tests passed!")
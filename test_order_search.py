@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test order search normalization and the local trigram index (order_search.py)
+"""
+
+import os
+import tempfile
+
+from local_order_store import LocalOrderStore
+from order_search import normalize_phone, normalize_query, normalize_text
+
+
+def test_normalization():
+    """Letter variants, diacritics and phone prefixes fold to one form"""
+    assert normalize_text("أحمد") == normalize_text("احمد")
+    assert normalize_text("فاطِمَة") == "فاطمه"
+    assert normalize_text("  Hélène   Dupont ") == "helene dupont"
+    assert normalize_phone("+213 555 12 34 56") == "0555123456"
+    assert normalize_phone("00213555123456") == "0555123456"
+    assert normalize_phone("٠٥٥٥١٢٣٤٥٦") == "0555123456"
+    assert normalize_query("+213 555") == "0555"
+    assert normalize_query("213555123456") == "0555123456"
+    assert normalize_query("2134") == "2134"  # scan_id fragment, not a country code
+    assert normalize_query("Ahmed") == "ahmed"
+    print("✅ Search normalization")
+
+
+def test_local_trigram_search():
+    """Searches match through the trigram index and follow updates and deletes"""
+    print("🔎 Searching the local store")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+        store.upsert({"id": 1, "customer_name": "أحمد بن علي", "customer_phone": "+213555123456",
+                      "scan_id": "ABC123", "created_at": "2024-05-01T10:00:01"})
+        store.upsert({"id": 2, "customer_name": "Hélène", "customer_phone": "0661000000",
+                      "scan_id": "XYZ789", "created_at": "2024-05-01T10:00:02"})
+
+        def ids(search):
+            return [o["id"] for o in store.query(search=search)]
+
+        assert ids("احمد") == [1]
+        assert ids("0555 12") == [1]
+        assert ids("00213555") == [1]
+        assert ids("213555123456") == [1]
+        store.upsert({"id": 3, "customer_name": "Karim", "customer_phone": "0770000000",
+                      "scan_id": "SC2134", "created_at": "2024-05-01T10:00:03"})
+        assert ids("2134") == [3]
+        store.delete(3)
+        assert ids("helene") == [2]
+        assert ids("xyz") == [2]
+        assert ids("ab") == [1]  # shorter than a trigram: substring check only
+        assert ids("100%") == []
+        assert store.count(search="0") == 2
+
+        store.update(2, {"customer_name": "Samira"})
+        assert ids("helene") == []
+        assert ids("samira") == [2]
+        store.delete(1)
+        assert ids("احمد") == []
+    print("✅ Local trigram search")
+
+
+if __name__ == "__main__":
+    test_normalization()
+    test_local_trigram_search()
+    print("🎉 All order search tests passed")
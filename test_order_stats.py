@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test the incrementally maintained admin stats (order_stats.py)
+"""
+
+import threading
+import time
+
+from order_stats import OrderStatsAggregator
+
+
+def legacy_stats(rows):
+    """The full-table computation get_admin_stats used to run on every refresh"""
+    stats = {"total_orders": len(rows), "confirmed_orders": 0, "shipped_orders": 0,
+             "total_revenue": 0, "agent_stats": {}}
+    for o in rows:
+        if o.get('status') == 'confirmed':
+            stats["confirmed_orders"] += 1
+            if o.get('confirmation_agent'):
+                agent = o['confirmation_agent'].strip()
+                stats["agent_stats"][agent] = stats["agent_stats"].get(agent, 0) + 1
+        if o.get('status') == 'shipped':
+            stats["shipped_orders"] += 1
+            stats["total_revenue"] += float(str(o.get('total_amount') or 0).replace(',', ''))
+    return stats
+
+
+def test_incremental_matches_full_recompute():
+    """Creates, status changes and deletes give the same numbers as a full pass"""
+    print("📊 Comparing incremental stats with a full recompute")
+    rows = {i: {"id": i, "status": "pending", "confirmation_agent": "", "total_amount": "4,000"}
+            for i in range(1, 6)}
+    stats = OrderStatsAggregator(lambda: [dict(r) for r in rows.values()])
+    stats.reconcile()
+
+    rows[6] = {"id": 6, "status": "pending", "confirmation_agent": "", "total_amount": 3500}
+    stats.record(rows[6])
+    for order_id, updates in ((1, {"status": "confirmed", "confirmation_agent": "amina"}),
+                              (2, {"status": "confirmed", "confirmation_agent": "karim"}),
+                              (1, {"status": "shipped"}),
+                              (6, {"status": "shipped", "total_amount": "3,900"})):
+        rows[order_id].update(updates)
+        stats.update(order_id, updates)
+    del rows[3]
+    stats.remove(3)
+    for order_id in (4, 5):
+        rows[order_id].update({"status": "shipped", "confirmation_agent": "karim"})
+    stats.update_many([4, "5"], {"status": "shipped", "confirmation_agent": "karim", "notes": "batch"})
+
+    assert stats.snapshot() == legacy_stats(list(rows.values()))
+    amina = [r for r in rows.values() if r["confirmation_agent"] == "amina"]
+    assert stats.snapshot(agent="amina") == legacy_stats(amina)
+    assert not stats.dirty
+    print("✅ Incremental stats match")
+
+
+def test_unknown_order_marks_dirty():
+    """Changes to orders created elsewhere trigger a reconcile"""
+    stats = OrderStatsAggregator(lambda: [{"id": 1, "status": "confirmed", "confirmation_agent": "amina"}])
+    stats.reconcile()
+    stats.update(99, {"status": "shipped"})
+    assert stats.dirty
+    stats.update(1, {"notes": "call later"})
+    stats.reconcile()
+    assert not stats.dirty and stats.snapshot()["agent_stats"] == {"amina": 1}
+    print("✅ Unknown orders schedule a reconcile")
+
+
+def test_concurrent_reconciles():
+    """Two reconciles at once keep the updates made while either one loads"""
+    print("🔁 Running overlapping reconciles")
+    rows = {1: {"id": 1, "status": "pending", "confirmation_agent": "", "total_amount": "1000"}}
+    loading = threading.Event()
+
+    def load_rows():
+        snapshot = [dict(r) for r in rows.values()]
+        loading.set()
+        time.sleep(0.05)
+        return snapshot
+
+    stats = OrderStatsAggregator(load_rows)
+    stats.reconcile()
+    threads = [threading.Thread(target=stats.reconcile) for _ in range(2)]
+    loading.clear()
+    threads[0].start()
+    loading.wait()
+    threads[1].start()
+    # Lands while the first reconcile is still inside load_rows()
+    rows[1]["status"] = "shipped"
+    stats.update(1, {"status": "shipped"})
+    for thread in threads:
+        thread.join()
+    assert stats.snapshot()["shipped_orders"] == 1
+    assert not stats.dirty
+    print("✅ Overlapping reconciles run one at a time")
+
+
+if __name__ == "__main__":
+    test_incremental_matches_full_recompute()
+    test_unknown_order_marks_dirty()
+    test_concurrent_reconciles()
+    print("🎉 All order stats tests passed!")
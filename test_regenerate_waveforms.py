@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the batch waveform regeneration pipeline against a local order store (regenerate_waveforms.py)
+"""
+
+import io
+import json
+import os
+import tempfile
+import wave
+
+import numpy as np
+from PIL import Image
+
+from local_order_store import LocalOrderStore
+from regenerate_waveforms import Checkpoint, LocalPublisher, WaveformRegenerator, iter_local_orders
+from supabase_client import PooledHTTPClient
+from waveform_analysis import DEFAULT_BAR_COUNT, stream_bar_energies
+from waveform_code import SPOTIFY_CODE_VERSION, render_spotify_code
+
+
+def write_tone(path, frequency):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        t = np.arange(16000) / 8000
+        w.writeframes((np.sin(2 * np.pi * frequency * t) * np.linspace(0, 1, t.size) * 12000).astype('<i2').tobytes())
+
+
+def make_store(root, count):
+    os.makedirs(os.path.join(root, "audio"))
+    store = LocalOrderStore(os.path.join(root, "orders.sqlite3"))
+    for i in range(1, count + 1):
+        write_tone(os.path.join(root, "audio", f"{i}.wav"), 200 + 40 * i)
+        store.upsert({"id": i, "scan_id": f"SCAN{i}", "audio_file_url": f"/api/uploads/audio/{i}.wav",
+                      "status": "pending", "created_at": f"2026-01-0{i}T10:00:00",
+                      "qr_code_data": json.dumps({"frame_note": "keep"})})
+    # No audio: never selected
+    store.upsert({"id": 99, "scan_id": "SCAN99", "audio_file_url": "", "status": "pending",
+                  "created_at": "2026-01-09T10:00:00"})
+    return store
+
+
+def regenerate(root, store, checkpoint_path, **checkpoint_options):
+    regenerator = WaveformRegenerator(LocalPublisher(store, os.path.join(root, "waveforms")),
+                                      Checkpoint(checkpoint_path, **checkpoint_options), PooledHTTPClient(), workers=2, downloads=2,
+                                      uploads=2, max_pending=3, formats=("png", "svg"), uploads_dir=root)
+    return regenerator.run(iter_local_orders(store))
+
+
+def test_regenerates_orders():
+    """Every order with audio gets a fresh PNG + SVG and updated metadata"""
+    print("🔁 Regenerating 5 local orders")
+    with tempfile.TemporaryDirectory() as root:
+        store = make_store(root, 5)
+        counts = regenerate(root, store, os.path.join(root, "checkpoint.jsonl"))
+        assert counts == {"done": 5, "failed": 0, "skipped": 0}, counts
+
+        order = store.get(3)
+        metadata = json.loads(order["qr_code_data"])
+        assert order["qr_code_url"] == "/api/uploads/waveforms/spotify_waveform_SCAN3.png"
+        assert metadata["waveform_svg_url"].endswith("spotify_waveform_SCAN3.svg")
+        assert metadata["frame_note"] == "keep" and metadata["scannable"]
+        with open(os.path.join(root, "waveforms", "spotify_waveform_SCAN3.png"), "rb") as f:
+            png = f.read()
+        expected = render_spotify_code(stream_bar_energies(os.path.join(root, "audio", "3.wav"), DEFAULT_BAR_COUNT),
+                                       "SCAN3")
+        assert png == expected
+        assert Image.open(io.BytesIO(png)).size == (800, 250)
+        assert store.get(99).get("qr_code_url") is None
+    print("✅ Orders regenerated")
+
+
+def test_checkpoint_resumes():
+    """A second run skips finished orders and retries the failed one"""
+    print("⏯️  Resuming from the checkpoint")
+    with tempfile.TemporaryDirectory() as root:
+        store = make_store(root, 4)
+        os.remove(os.path.join(root, "audio", "2.wav"))
+        checkpoint_path = os.path.join(root, "checkpoint.jsonl")
+        counts = regenerate(root, store, checkpoint_path)
+        assert counts == {"done": 3, "failed": 1, "skipped": 0}, counts
+
+        with open(checkpoint_path, "a") as f:
+            f.write('{"scan_id": "SCAN')  # torn line from a crash
+        write_tone(os.path.join(root, "audio", "2.wav"), 300)
+        counts = regenerate(root, store, checkpoint_path)
+        assert counts == {"done": 1, "failed": 0, "skipped": 3}, counts
+        assert Checkpoint(checkpoint_path).done == {"SCAN1", "SCAN2", "SCAN3", "SCAN4"}
+    print("✅ Checkpoint resume works")
+
+
+def test_template_change_redoes_orders():
+    """Orders done by an older renderer version are rendered again, then skipped"""
+    print("🆕 Re-rendering after a template change")
+    with tempfile.TemporaryDirectory() as root:
+        store = make_store(root, 3)
+        checkpoint_path = os.path.join(root, "checkpoint.jsonl")
+        assert regenerate(root, store, checkpoint_path)["done"] == 3
+
+        bumped = SPOTIFY_CODE_VERSION + "-next"
+        assert Checkpoint(checkpoint_path, renderer=bumped).done == set()
+        counts = regenerate(root, store, checkpoint_path, renderer=bumped)
+        assert counts == {"done": 3, "failed": 0, "skipped": 0}, counts
+        assert regenerate(root, store, checkpoint_path, renderer=bumped)["skipped"] == 3
+        with open(checkpoint_path) as f:
+            assert json.loads(f.readlines()[-1])["renderer"] == bumped
+    print("✅ New template version redoes finished orders")
+
+
+if __name__ == "__main__":
+    test_regenerates_orders()
+    test_checkpoint_resumes()
+    test_template_change_redoes_orders()
+    print("🎉 All waveform regeneration tests passed")
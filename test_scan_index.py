@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the per-frame scan index used by /api/scan/<frame_id>/ and the
+scan_id lookup cache used by /api/audio/<scan_id>/
+"""
+
+import time
+
+from scan_index import FrameScanIndex, ScanLookupCache
+
+
+def make_order(order_id, frame_id, created_at, audio=True):
+    return {
+        "id": order_id,
+        "frame_id": frame_id,
+        "created_at": created_at,
+        "audio_file_url": f"https://cdn.example.com/{order_id}.webm" if audio else ""
+    }
+
+
+def test_newest_audio_order_wins():
+    """Only orders with audio count, and the newest one is returned"""
+    print("🔍 Building index from local orders")
+    index = FrameScanIndex()
+    index.rebuild([
+        make_order(1, 5, "2024-01-01T10:00:00"),
+        make_order(2, 5, "2024-01-03T10:00:00", audio=False),
+        make_order(3, 5, "2024-01-02T10:00:00"),
+        make_order(4, 6, "2024-01-04T10:00:00"),
+    ])
+    order, fresh = index.lookup(5)
+    assert order["id"] == 3
+    assert not fresh  # local data still needs one Supabase check
+    print("✅ Newest audio-bearing order selected")
+
+
+def test_store_marks_fresh_and_merges():
+    """Supabase's answer is merged with newer local-only orders"""
+    index = FrameScanIndex(fresh_ttl=60)
+    index.upsert(make_order(10, 7, "2024-02-02T00:00:00"))
+    latest = index.store(7, make_order(9, 7, "2024-02-01T00:00:00"))
+    assert latest["id"] == 10
+    assert index.lookup(7) == (latest, True)
+
+    assert index.store(8, None) is None
+    assert index.lookup(8) == (None, True)
+    print("✅ Supabase result merged and frame marked fresh")
+
+
+def test_updates_and_deletes_invalidate():
+    """Moving, stripping or deleting the latest order forces a re-check"""
+    index = FrameScanIndex(fresh_ttl=60)
+    index.store(1, make_order(20, 1, "2024-03-01T00:00:00"))
+
+    index.apply_updates(20, {"status": "confirmed"})
+    order, fresh = index.lookup(1)
+    assert order["status"] == "confirmed" and fresh
+
+    index.apply_updates(20, {"frame_id": 2})
+    assert index.lookup(1) == (None, False)
+    assert index.lookup(2)[0]["id"] == 20
+
+    index.store(2, None)
+    index.remove(20)
+    assert index.lookup(2) == (None, False)
+
+    index.store(3, None)
+    index.apply_updates(99, {"frame_id": 3, "audio_file_url": "x"})
+    assert index.lookup(3) == (None, False)
+    print("✅ Updates and deletes keep the index current")
+
+
+def test_lookup_cache_invalidation_and_expiry():
+    """Entries are dropped by id or scan_id, misses expire after negative_ttl"""
+    cache = ScanLookupCache(ttl=60, negative_ttl=0.05, max_entries=2)
+    order = {"id": 42, "scan_id": "ABC123"}
+    cache.put("ABC123", {"success": True, "order": order}, order)
+    assert cache.get("ABC123")[0]
+    cache.invalidate(42)
+    assert cache.get("ABC123") == (False, None)
+
+    cache.put("NOPE", None)
+    assert cache.get("NOPE") == (True, None)
+    time.sleep(0.06)
+    assert cache.get("NOPE") == (False, None)
+
+    for key in ("A", "B", "C"):
+        cache.put(key, {"success": True})
+    assert len(cache) == 2 and not cache.get("A")[0]
+    print("✅ Lookup cache invalidates, expires and stays bounded")
+
+
+if __name__ == "__main__":
+    test_newest_audio_order_wins()
+    test_store_marks_fresh_and_merges()
+    test_updates_and_deletes_invalidate()
+    test_lookup_cache_invalidation_and_expiry()
+    print("🎉 All scan index tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized bar extraction in waveform_analysis.py against the old
+per-slice loop used by analyze_audio_waveform
+"""
+
+import numpy as np
+
+from waveform_analysis import StreamingBarAccumulator, extract_bar_energies
+
+
+def legacy_bar_energies(y, bar_count=60):
+    """The original Python loop, kept here as the reference implementation"""
+    hop_length = len(y) // bar_count
+    waveform_data = []
+    for i in range(bar_count):
+        segment = y[i * hop_length:min((i + 1) * hop_length, len(y))]
+        if len(segment) > 0:
+            rms = np.sqrt(np.mean(segment**2))
+            waveform_data.append(min(1.0, np.log1p(rms * 10) / np.log1p(1.0)))
+        else:
+            waveform_data.append(0.1)
+    return np.array(waveform_data)
+
+
+def test_matches_legacy_curve():
+    """Same curve as the old loop when the length divides evenly"""
+    print("🎵 Comparing vectorized extraction with the legacy loop")
+    y = np.random.uniform(-1, 1, 8000 * 30).astype(np.float32)
+    assert np.allclose(extract_bar_energies(y, 60), legacy_bar_energies(y, 60))
+    print("✅ Curves match")
+
+
+def test_tail_is_included():
+    """Loud samples after bar_count * hop_length must reach the last bar"""
+    y = np.zeros(60 * 100 + 59, dtype=np.float32)
+    y[-59:] = 1.0
+    bars = extract_bar_energies(y, 60)
+    assert bars[-1] > 0.1
+    assert legacy_bar_energies(y, 60)[-1] == 0.0
+    print("✅ Tail samples counted in the last bar")
+
+
+def test_any_bar_count_and_short_signal():
+    """Any bar count works and bars without samples use the minimum height"""
+    for bar_count in (1, 30, 60, 80, 128):
+        assert len(extract_bar_energies(np.ones(10000), bar_count)) == bar_count
+    bars = extract_bar_energies(np.ones(10), 60)
+    assert len(bars) == 60
+    assert np.isclose(bars.min(), 0.1)
+    assert len(extract_bar_energies(np.array([]), 60)) == 60
+    print("✅ Bar counts and short signals handled")
+
+
+def test_streaming_matches_in_memory():
+    """Folding blocks of any size gives the same curve as the in-memory pass"""
+    y = np.random.uniform(-1, 1, 8000 * 20 + 123)
+    expected = extract_bar_energies(y, 60)
+    for block_size in (1000, 4096, 65536):
+        accumulator = StreamingBarAccumulator(60)
+        for start in range(0, len(y), block_size):
+            accumulator.add(y[start:start + block_size])
+        assert np.allclose(accumulator.finish(), expected, atol=1e-2)
+    print("✅ Streaming curve matches in-memory curve")
+
+
+def test_streaming_respects_max_samples():
+    """Samples past max_samples are ignored and stereo blocks are downmixed"""
+    accumulator = StreamingBarAccumulator(60, max_samples=6000)
+    accumulator.add(np.full((4000, 2), 0.5))
+    accumulator.add(np.full((4000, 2), 0.5))
+    assert accumulator.full
+    assert accumulator.samples_seen == 6000
+    assert np.allclose(accumulator.finish(), extract_bar_energies(np.full(6000, 0.5), 60))
+    print("✅ Streaming stops at the analysis duration")
+
+
+if __name__ == "__main__":
+    test_matches_legacy_curve()
+    test_tail_is_included()
+    test_any_bar_count_and_short_signal()
+    test_streaming_matches_in_memory()
+    test_streaming_respects_max_samples()
+    print("🎉 All waveform analysis tests passed!")
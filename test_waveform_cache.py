@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed waveform cache (waveform_cache.py)
+"""
+
+import os
+import tempfile
+import time
+
+from waveform_cache import WaveformCache, hash_audio_bytes, hash_audio_file, render_key
+
+
+def test_hash_and_keys():
+    """File and byte hashes agree; render keys depend on every parameter"""
+    data = os.urandom(3 * 1024 * 1024 + 7)
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(data)
+    try:
+        assert hash_audio_file(f.name) == hash_audio_bytes(data)
+    finally:
+        os.remove(f.name)
+
+    audio_hash = hash_audio_bytes(data)
+    assert render_key(audio_hash, scan_id="A", bar_count=60) == render_key(audio_hash, bar_count=60, scan_id="A")
+    assert render_key(audio_hash, scan_id="A", bar_count=60) != render_key(audio_hash, scan_id="B", bar_count=60)
+    print("✅ Hashes and render keys are stable")
+
+
+def test_round_trip_and_lru_eviction():
+    """Entries round-trip and the least recently used ones are evicted first"""
+    with tempfile.TemporaryDirectory() as root:
+        cache = WaveformCache(root, max_bytes=10000)
+        cache.put_bars("aaa", 60, [0.5] * 60)
+        assert cache.get_bars("aaa", 60) == [0.5] * 60
+        assert cache.get_bars("aaa", 30) is None
+        bars_size = cache.total_bytes
+
+        cache.put_render("old", "https://example.com/old.png", waveform_svg_url="https://example.com/old.svg")
+        # Room for the bars and two renders, not three
+        cache.max_bytes = bars_size + (cache.total_bytes - bars_size) * 5 // 2
+        time.sleep(0.05)
+        cache.put_render("new", "https://example.com/new.png", waveform_svg_url="https://example.com/new.svg")
+        time.sleep(0.05)
+        assert cache.get_render("old") == {"waveform_url": "https://example.com/old.png",
+                                           "waveform_svg_url": "https://example.com/old.svg"}
+        assert sorted(os.listdir(root)) == ["bars_aaa_60.json", "render_new.json", "render_old.json"]
+
+        assert cache.get_bars("aaa", 60) is not None
+        # "new" is now the least recently used entry and must go first
+        cache.put_render("third", "https://example.com/thr.png", waveform_svg_url="https://example.com/thr.svg")
+        assert cache.total_bytes <= cache.max_bytes
+        assert cache.get_render("new") is None
+        assert cache.get_render("third")["waveform_url"] == "https://example.com/thr.png"
+
+        # A fresh instance sees what is on disk and drops image bytes older versions stored
+        with open(os.path.join(root, "render_old.png"), "wb") as f:
+            f.write(b"x" * 1000)
+        reopened = WaveformCache(root, max_bytes=cache.max_bytes)
+        assert reopened.total_bytes == cache.total_bytes
+        assert not os.path.exists(os.path.join(root, "render_old.png"))
+    print("✅ Cache round-trips and evicts LRU entries")
+
+
+if __name__ == "__main__":
+    test_hash_and_keys()
+    test_round_trip_and_lru_eviction()
+    print("🎉 All waveform cache tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite-backed background waveform job queue (waveform_jobs.py)
+"""
+
+import os
+import tempfile
+import time
+
+from waveform_jobs import WaveformJobQueue, JOB_DONE, JOB_FAILED, JOB_RUNNING
+
+
+def wait_for(queue, scan_id, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(scan_id)
+        if job and job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    return queue.get(scan_id)
+
+
+def test_jobs_run_and_retry():
+    """Jobs complete with their result; failing jobs retry then fail"""
+    calls = {}
+
+    def handler(payload):
+        calls[payload["scan_id"]] = calls.get(payload["scan_id"], 0) + 1
+        if payload.get("fail"):
+            raise Exception("boom")
+        return {"waveform_url": f"/w/{payload['scan_id']}.png"}
+
+    with tempfile.TemporaryDirectory() as root:
+        queue = WaveformJobQueue(os.path.join(root, "jobs.sqlite3"), handler,
+                                 workers=2, max_attempts=2, poll_interval=0.05)
+        queue.start()
+        try:
+            queue.enqueue("OK1", {"scan_id": "OK1"})
+            queue.enqueue("BAD1", {"scan_id": "BAD1", "fail": True})
+
+            job = wait_for(queue, "OK1", {JOB_DONE})
+            assert job["status"] == JOB_DONE
+            assert job["result"] == {"waveform_url": "/w/OK1.png"}
+
+            job = wait_for(queue, "BAD1", {JOB_FAILED})
+            assert job["status"] == JOB_FAILED
+            assert job["attempts"] == 2 and calls["BAD1"] == 2
+            assert job["error"] == "boom"
+        finally:
+            queue.stop()
+    print("✅ Jobs run, retry and fail as expected")
+
+
+def test_jobs_survive_restart():
+    """A job queued before the workers start is picked up later"""
+    with tempfile.TemporaryDirectory() as root:
+        db_path = os.path.join(root, "jobs.sqlite3")
+        WaveformJobQueue(db_path, lambda p: {}).enqueue("LATE", {"scan_id": "LATE"})
+
+        queue = WaveformJobQueue(db_path, lambda p: {"ok": True}, poll_interval=0.05)
+        queue.start()
+        try:
+            assert wait_for(queue, "LATE", {JOB_DONE})["result"] == {"ok": True}
+        finally:
+            queue.stop()
+    print("✅ Queued jobs survive a restart")
+
+
+def test_stale_jobs_give_up():
+    """A job whose worker keeps dying is re-claimed until max_attempts, then failed"""
+    with tempfile.TemporaryDirectory() as root:
+        queue = WaveformJobQueue(os.path.join(root, "jobs.sqlite3"), lambda p: {}, max_attempts=2, stale_after=0)
+        queue.enqueue("CRASH", {"scan_id": "CRASH"})
+        # Claim without finishing, as if the worker process died each time
+        for attempt in (1, 2):
+            row = queue._claim()
+            assert row["scan_id"] == "CRASH"
+            time.sleep(0.01)
+            job = queue.get("CRASH")
+            assert job["status"] == JOB_RUNNING and job["attempts"] == attempt
+        assert queue._claim() is None
+        job = queue.get("CRASH")
+        assert job["status"] == JOB_FAILED and job["attempts"] == 2 and "attempts exhausted" in job["error"]
+    print("✅ Stale jobs stop after max_attempts")
+
+
+if __name__ == "__main__":
+    test_jobs_run_and_retry()
+    test_jobs_survive_restart()
+    test_stale_jobs_give_up()
+    print("🎉 All waveform job queue tests passed!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the PNG encoding profiles for waveform codes (waveform_png.py)
+"""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from waveform_png import PNG_PROFILES, compare_profiles, encode_png, png_encode_stats, reencode_png
+from waveform_raster import bars_image
+from waveform_render import get_render_context
+from waveform_sprites import spotify_code_radius
+
+
+def sample_code():
+    """An 800x250 code with bars and a label, as create_spotify_waveform_image draws it"""
+    waveform = np.random.default_rng(22).random(50)
+    image = bars_image(waveform, 800, 250, bar_width=8, bar_spacing=4, max_bar_height=140,
+                       min_bar_height=8, center_y=100, radius_rule=spotify_code_radius).convert('RGB')
+    context = get_render_context(800, 250)
+    text_w, _ = context.text_size("#123456", 32)
+    ImageDraw.Draw(image).text(((800 - text_w) // 2, 190), "#123456", fill='black', font=context.font(32))
+    return image
+
+
+def test_profiles_keep_the_code():
+    """1-bit profiles keep every bar pixel; lossless profiles keep everything"""
+    print("🗜️  Encoding with each profile")
+    image = sample_code()
+    gray = np.asarray(image.convert('L'))
+    for profile, settings in PNG_PROFILES.items():
+        decoded = Image.open(io.BytesIO(encode_png(image, profile)))
+        pixels = np.asarray(decoded.convert('L'))
+        if settings["mode"] == "1":
+            assert decoded.mode == '1'
+            assert np.array_equal(pixels, np.where(gray >= settings["threshold"], 255, 0))
+            assert not (np.isin(gray, (0, 255)) & (pixels != gray)).any()
+        else:
+            assert np.array_equal(pixels, gray), profile
+    archived = Image.open(io.BytesIO(reencode_png(encode_png(image, "legacy"))))
+    assert archived.mode == 'L' and np.array_equal(np.asarray(archived), gray)
+    try:
+        encode_png(image, "jpeg")
+        assert False, "unknown profile accepted"
+    except ValueError:
+        pass
+    print("✅ Profiles decode to the expected pixels")
+
+
+def test_profile_report():
+    """fast is smaller than the legacy encode (timings are printed, not asserted); stats are tallied"""
+    report = compare_profiles(sample_code())
+    for profile, entry in report.items():
+        print(f"⏱️  {profile:8s} {entry['bytes']:6d} bytes {entry['ms']:7.3f} ms")
+    assert report["fast"]["bytes"] < report["legacy"]["bytes"]
+    assert all(entry["ms"] >= 0 for entry in report.values())
+    assert report["bilevel"]["bytes"] <= report["fast"]["bytes"]
+
+    before = png_encode_stats.snapshot().get("fast", {}).get("images", 0)
+    data = encode_png(sample_code(), "fast")
+    stats = png_encode_stats.snapshot()["fast"]
+    assert stats["images"] == before + 1 and stats["avg_bytes"] > 0
+    assert len(data) == report["fast"]["bytes"]
+    print("✅ Profile sizes and timings reported")
+
+
+if __name__ == "__main__":
+    test_profiles_keep_the_code()
+    test_profile_report()
+    print("🎉 All waveform PNG tests passed")
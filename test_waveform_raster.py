@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the NumPy bar rasterizer against the sprite renderer (waveform_raster.py)
+"""
+
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from waveform_raster import bars_image, centered_bar_table, rasterize_bars
+from waveform_sprites import get_bar_atlas, half_height_radius, spotify_code_radius
+
+
+def sprite_render(waveform, width, height, bar_width, bar_spacing, max_bar_height, min_bar_height,
+                  center_y, radius_rule):
+    """The PIL path: one sprite paste per bar"""
+    image = Image.new('L', (width, height), 255)
+    atlas = get_bar_atlas(bar_width, radius_rule, min_bar_height, max_bar_height)
+    start_x = (width - (len(waveform) * (bar_width + bar_spacing) - bar_spacing)) // 2
+    for i, amplitude in enumerate(waveform):
+        bar_height = max(min_bar_height, int(amplitude * max_bar_height))
+        atlas.paste_bar(image, start_x + i * (bar_width + bar_spacing), center_y - bar_height // 2,
+                        bar_height, 0)
+    return np.asarray(image)
+
+
+def test_raster_matches_sprites():
+    """Spotify code layout, generator layout, clipped and overlapping bars"""
+    print("🧮 Comparing rasterized bars with pasted sprites")
+    rng = np.random.default_rng(21)
+    layouts = [
+        (800, 250, 8, 4, 140, 8, 100, spotify_code_radius, 50),
+        (800, 200, 8, 4, 160, 4, 100, half_height_radius, 40),
+        (300, 120, 8, 4, 140, 8, 60, spotify_code_radius, 40),   # wider than the canvas, taller too
+        (400, 200, 8, 0, 140, 8, 100, half_height_radius, 30),   # bars touching
+        (400, 200, 6, 2, 100, 2, 100, spotify_code_radius, 0),   # no bars
+    ]
+    for width, height, bar_width, bar_spacing, max_h, min_h, center_y, rule, bars in layouts:
+        for waveform in (rng.random(bars), rng.random(bars) * 1.3, np.zeros(bars)):
+            expected = sprite_render(waveform, width, height, bar_width, bar_spacing, max_h, min_h,
+                                     center_y, rule)
+            actual = rasterize_bars(waveform, width, height, bar_width=bar_width, bar_spacing=bar_spacing,
+                                    max_bar_height=max_h, min_bar_height=min_h, center_y=center_y,
+                                    radius_rule=rule)
+            assert actual.dtype == np.uint8 and actual.shape == (height, width)
+            assert np.array_equal(actual, expected), (width, height, bar_spacing, bars)
+    print("✅ Rasterized bars are pixel-identical")
+
+
+def test_tall_bars_keep_table_size():
+    """Amplitudes far above 1 are drawn like the sprites without growing the height table"""
+    print("📏 Rasterizing bars taller than max_bar_height")
+    waveform = np.array([0.5, 1.0, 1.01, 40.0, 0.2, 3.0])
+    layout = dict(bar_width=8, bar_spacing=4, max_bar_height=140, min_bar_height=8, center_y=100,
+                  radius_rule=spotify_code_radius)
+    expected = sprite_render(waveform, 800, 250, **layout)
+    assert np.array_equal(rasterize_bars(waveform, 800, 250, **layout), expected)
+    table, _ = centered_bar_table(8, spotify_code_radius, 8, 140, 100)
+    assert table.shape == (142, 142, 9) and not table[141].any()
+    print("✅ Tall bars drawn separately, table stays max_bar_height rows")
+
+
+def test_benchmark_against_sprites():
+    """Bars plus PNG encoding for the 800x250 code, both paths"""
+    waveform = np.random.default_rng(3).random(50)
+    layout = dict(bar_width=8, bar_spacing=4, max_bar_height=140, min_bar_height=8, center_y=100,
+                  radius_rule=spotify_code_radius)
+    rounds = 200
+
+    def encode(image):
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+    timings = {}
+    for name, render in (("sprites", lambda: Image.fromarray(sprite_render(waveform, 800, 250, **layout))),
+                         ("numpy", lambda: bars_image(waveform, 800, 250, **layout))):
+        render()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            render()
+        bars_ms = (time.perf_counter() - started) * 1000 / rounds
+        started = time.perf_counter()
+        for _ in range(rounds // 10):
+            png = encode(render())
+        total_ms = (time.perf_counter() - started) * 1000 / (rounds // 10)
+        timings[name] = (bars_ms, total_ms, png)
+
+    assert timings["sprites"][2] == timings["numpy"][2]
+    for name, (bars_ms, total_ms, png) in timings.items():
+        print(f"⏱️  {name:8s} bars {bars_ms:.3f} ms, with PNG encode {total_ms:.2f} ms ({len(png)} bytes)")
+    print("✅ Both paths encode to the same PNG")
+
+
+if __name__ == "__main__":
+    test_raster_matches_sprites()
+    test_tall_bars_keep_table_size()
+    test_benchmark_against_sprites()
+    print("🎉 All waveform raster tests passed")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the process-wide waveform render context (waveform_render.py)
+"""
+
+import os
+import tempfile
+
+from PIL import ImageDraw
+
+from waveform_render import WaveformRenderContext, get_render_context, load_font
+
+
+def test_fonts_and_canvas_are_shared():
+    """Fonts load once, canvases are independent copies of the template"""
+    print("🖋️  Checking the render context")
+    context = get_render_context(800, 250)
+    assert context is get_render_context(800, 250)
+    assert context.font(32) is context.font(32)
+
+    first = context.canvas()
+    ImageDraw.Draw(first).rectangle([0, 0, 10, 10], fill='black')
+    second = context.canvas()
+    assert second.getpixel((5, 5)) == (255, 255, 255) and first.getpixel((5, 5)) == (0, 0, 0)
+    print("✅ Fonts loaded once, canvases copied")
+
+
+def test_font_fallback_and_label_metrics():
+    """Unreadable font files are skipped; label boxes match draw.textbbox"""
+    with tempfile.TemporaryDirectory() as root:
+        broken = os.path.join(root, "broken.ttf")
+        with open(broken, "w") as f:
+            f.write("404: Not Found")
+        paths = ("/nonexistent/font.ttf", broken)
+        font = load_font(40, paths)
+        assert font is load_font(40, paths) and getattr(font, "path", None) != broken
+
+    context = WaveformRenderContext(400, 100, label_cache_size=2)
+    canvas = context.canvas()
+    expected = ImageDraw.Draw(canvas).textbbox((0, 0), "#AB12CD", font=context.font(40))
+    assert context.text_bbox("#AB12CD", 40) == expected
+    assert context.text_size("#AB12CD", 40) == (expected[2] - expected[0], expected[3] - expected[1])
+    for label in ("#1", "#2", "#3"):
+        context.text_bbox(label, 40)
+    assert len(context._labels) == 2
+    print("✅ Font fallback and cached label metrics")
+
+
+if __name__ == "__main__":
+    test_fonts_and_canvas_are_shared()
+    test_font_fallback_and_label_metrics()
+    print("🎉 All render context tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the pre-rendered bar sprites against direct drawing (waveform_sprites.py)
+"""
+
+import io
+import os
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from standalone_waveform_generator import SpotifyWaveformGenerator
+from waveform_sprites import BarSpriteAtlas, get_bar_atlas, half_height_radius, spotify_code_radius
+
+
+def draw_bar(draw, x, y, bar_width, bar_height, radius_rule, fill):
+    """The per-bar rounded_rectangle call the renderers used to make"""
+    box = [x, y, x + bar_width, y + bar_height]
+    radius = radius_rule(bar_width, bar_height)
+    if radius <= 0:
+        draw.rectangle(box, fill=fill)
+    else:
+        draw.rounded_rectangle(box, radius=radius, fill=fill)
+
+
+def test_sprites_match_drawn_bars():
+    """Every height, both corner rules, opaque and translucent fills"""
+    print("🧩 Comparing sprites with rounded_rectangle")
+    for radius_rule in (spotify_code_radius, half_height_radius):
+        atlas = BarSpriteAtlas(8, radius_rule, 0, 160)
+        for bar_height in range(0, 170):
+            for mode, background, fill in (("RGB", "white", "black"), ("RGBA", (0, 0, 0, 0), (200, 0, 0, 128))):
+                drawn = Image.new(mode, (20, 200), background)
+                pasted = drawn.copy()
+                draw_bar(ImageDraw.Draw(drawn), 3, 10, 8, bar_height, radius_rule, fill)
+                atlas.paste_bar(pasted, 3, 10, bar_height, fill)
+                assert drawn.tobytes() == pasted.tobytes(), (radius_rule.__name__, bar_height, mode)
+    assert get_bar_atlas(8, spotify_code_radius, 8, 140) is get_bar_atlas(8, spotify_code_radius, 8, 140)
+    print("✅ Sprites are pixel-identical")
+
+
+def test_generator_image_unchanged():
+    """A full waveform code renders the same pixels, faster"""
+    generator = SpotifyWaveformGenerator()
+    waveform = np.random.default_rng(7).random(generator.bar_count)
+
+    def legacy_render():
+        image = Image.new('RGB', (generator.width, generator.height), 'white')
+        draw = ImageDraw.Draw(image)
+        start_x = (generator.width - (generator.bar_count * 12 - 4)) // 2
+        for i, amplitude in enumerate(waveform):
+            bar_height = max(4, int(amplitude * generator.max_bar_height))
+            draw_bar(draw, start_x + i * 12, (generator.height - bar_height) // 2, 8, bar_height,
+                     half_height_radius, 'black')
+        return image
+
+    rendered = Image.open(io.BytesIO(generator._create_waveform_image(waveform)))
+    assert rendered.convert('RGB').tobytes() == legacy_render().tobytes()
+
+    atlas = get_bar_atlas(8, min_height=4, max_height=generator.max_bar_height)
+    started = time.perf_counter()
+    for _ in range(50):
+        legacy_render()
+    drawn_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(50):
+        image = Image.new('RGB', (generator.width, generator.height), 'white')
+        for i, amplitude in enumerate(waveform):
+            bar_height = max(4, int(amplitude * generator.max_bar_height))
+            atlas.paste_bar(image, 160 + i * 12, (generator.height - bar_height) // 2, bar_height, 'black')
+    pasted_time = time.perf_counter() - started
+    print(f"✅ Generator output unchanged (bars: {drawn_time * 20:.2f} ms drawn, {pasted_time * 20:.2f} ms pasted)")
+
+
+def test_vendored_copy_in_sync():
+    """The Django app's vendored waveform_sprites.py has the same code as the shared module"""
+    root = os.path.dirname(os.path.abspath(__file__))
+
+    def code(path):
+        with open(os.path.join(root, path), encoding="utf-8") as f:
+            source = f.read()
+        return source.split('"""', 2)[2]  # everything after the module docstring
+
+    assert code("waveform_sprites.py") == code(os.path.join("django_waveform_generator", "waveform_sprites.py"))
+    print("✅ Vendored sprite atlas matches")
+
+
+if __name__ == "__main__":
+    test_sprites_match_drawn_bars()
+    test_generator_image_unchanged()
+    test_vendored_copy_in_sync()
+    print("🎉 All waveform sprite tests passed")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test the SVG output for waveform codes (waveform_svg.py)
+"""
+
+import io
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from PIL import Image
+
+from standalone_waveform_generator import SpotifyWaveformGenerator
+from waveform_sprites import spotify_code_radius
+from waveform_svg import render_svg
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_svg_bars_match_png():
+    """Each SVG bar covers exactly the ink of the matching PNG bar"""
+    print("📐 Comparing SVG bars with the PNG")
+    generator = SpotifyWaveformGenerator()
+    waveform = np.random.default_rng(23).random(generator.bar_count)
+    ink = np.asarray(Image.open(io.BytesIO(generator._create_waveform_image(waveform))).convert('L')) < 128
+
+    root = ET.fromstring(generator._create_waveform_svg(waveform))
+    assert root.get("viewBox") == f"0 0 {generator.width} {generator.height}"
+    bars = root.find(f"{SVG_NS}g").findall(f"{SVG_NS}rect")
+    assert len(bars) == generator.bar_count
+    for rect in bars:
+        x, y, w, h = (int(rect.get(name)) for name in ("x", "y", "width", "height"))
+        box = ink[y:y + h, x:x + w]
+        assert box[:, w // 2].all(), "bar centre column not fully inked"
+        assert not ink[y - 1, x:x + w].any() and not ink[y + h, x:x + w].any()
+        assert not ink[y:y + h, x - 1].any() and not ink[y:y + h, x + w].any()
+        assert int(rect.get("rx", 0)) == min(8 // 2, (h - 1) // 2)
+    print("✅ SVG bar boxes line up with the PNG")
+
+
+def test_svg_label_and_cost():
+    """Label is escaped and centred; SVG and PNG costs are printed, not asserted"""
+    svg = render_svg([(10, 20, 30)], 100, 80, 8, spotify_code_radius, label="#12<&>", label_top=40, font_size=20)
+    root = ET.fromstring(svg)
+    text = root.find(f"{SVG_NS}text")
+    assert text.text == "#12<&>" and text.get("x") == "50" and text.get("text-anchor") == "middle"
+    assert int(text.get("y")) > 40
+
+    generator = SpotifyWaveformGenerator()
+    waveform = np.random.default_rng(5).random(generator.bar_count)
+    timings = {}
+    for name, render in (("png", generator._create_waveform_image), ("svg", generator._create_waveform_svg)):
+        started = time.perf_counter()
+        for _ in range(20):
+            output = render(waveform)
+        timings[name] = ((time.perf_counter() - started) * 50, len(output))
+    print(f"⏱️  png {timings['png'][0]:.2f} ms ({timings['png'][1]} bytes), "
+          f"svg {timings['svg'][0]:.3f} ms ({timings['svg'][1]} bytes)")
+    assert len(ET.fromstring(output).findall(f"{SVG_NS}g/{SVG_NS}rect")) == generator.bar_count
+    print("✅ SVG label and cost checked")
+
+
+if __name__ == "__main__":
+    test_svg_bars_match_png()
+    test_svg_label_and_cost()
+    print("🎉 All waveform SVG tests passed")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Shared waveform analysis helpers for the Spotify-style waveform codes.
+Turns a decoded mono signal (or an audio file decoded block by block) into
+the normalized per-bar RMS curve used by every waveform renderer in this repo.
+"""
+
+import numpy as np
+
+# Streaming decoders (both ship with librosa)
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    import audioread
+    AUDIOREAD_AVAILABLE = True
+except ImportError:
+    AUDIOREAD_AVAILABLE = False
+
+DEFAULT_BAR_COUNT = 60  # Standard Spotify configuration
+MIN_BAR_LEVEL = 0.1  # Minimum height for bars with no samples
+MAX_ANALYSIS_DURATION = 60  # Seconds of audio used for the waveform
+STREAM_BLOCK_FRAMES = 65536  # Frames decoded per block in streaming mode
+STREAM_WINDOW = 512  # Samples folded into one energy window while streaming
+
+
+def bar_boundaries(total_samples, bar_count=DEFAULT_BAR_COUNT):
+    """Return bar_count + 1 sample offsets splitting the signal into near-equal bars.
+
+    Unlike the old `len(y) // bar_count` hop, the last bar always ends at
+    total_samples so the tail of the recording is never dropped.
+    """
+    return np.linspace(0, total_samples, bar_count + 1).astype(np.int64)
+
+
+def normalize_bar_energies(rms, counts=None):
+    """Apply the log scaling used for the bar heights and clip to [0, 1]."""
+    rms = np.asarray(rms, dtype=np.float64)
+    normalized = np.minimum(1.0, np.log1p(rms * 10) / np.log1p(1.0))
+    if counts is not None:
+        normalized = np.where(np.asarray(counts) > 0, normalized, MIN_BAR_LEVEL)
+    return normalized
+
+
+def compute_bar_rms(y, bar_count=DEFAULT_BAR_COUNT):
+    """Compute the raw RMS of each bar in a single vectorized pass.
+
+    Returns (rms, counts) where counts is the number of samples in each bar.
+    """
+    y = np.asarray(y, dtype=np.float64).ravel()
+    bounds = bar_boundaries(len(y), bar_count)
+
+    # Prefix sum of squares: the energy of any slice is a difference of two entries
+    energy = np.concatenate(([0.0], np.cumsum(y * y)))
+    sums = energy[bounds[1:]] - energy[bounds[:-1]]
+    counts = np.diff(bounds)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_square = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+    return np.sqrt(np.maximum(mean_square, 0.0)), counts
+
+
+def extract_bar_energies(y, bar_count=DEFAULT_BAR_COUNT):
+    """Return the normalized log-RMS curve (one value per bar) for a mono signal."""
+    rms, counts = compute_bar_rms(y, bar_count)
+    return normalize_bar_energies(rms, counts)
+
+
+class StreamingBarAccumulator:
+    """Fold decoded audio blocks into running energy sums without keeping the signal.
+
+    The total length is usually unknown while streaming (browser webm recordings
+    carry no duration), so energy is summed per fixed window of samples and the
+    windows are mapped onto bars in finish(). Memory is bounded by
+    max_samples / window floats no matter how large the upload is.
+    """
+
+    def __init__(self, bar_count=DEFAULT_BAR_COUNT, max_samples=None, window=STREAM_WINDOW):
+        self.bar_count = bar_count
+        self.max_samples = max_samples
+        self.window = window
+        self.samples_seen = 0
+        self._window_sums = []
+        self._pending = np.zeros(0, dtype=np.float64)
+
+    @property
+    def full(self):
+        return self.max_samples is not None and self.samples_seen >= self.max_samples
+
+    def add(self, block):
+        """Add a block of samples (mono, or frames x channels which get averaged)"""
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        if self.max_samples is not None:
+            block = block[:max(0, self.max_samples - self.samples_seen)]
+        if not len(block):
+            return
+        self.samples_seen += len(block)
+
+        squared = np.concatenate((self._pending, block * block))
+        full_windows = len(squared) // self.window
+        if full_windows:
+            cut = full_windows * self.window
+            self._window_sums.append(squared[:cut].reshape(full_windows, self.window).sum(axis=1))
+            squared = squared[cut:]
+        self._pending = squared
+
+    def finish_rms(self):
+        """Return (rms, counts) per bar, like compute_bar_rms"""
+        sums = self._window_sums + [np.array([self._pending.sum()])]
+        window_sums = np.concatenate(sums)
+        window_sizes = np.full(len(window_sums), self.window, dtype=np.int64)
+        window_sizes[-1] = len(self._pending)
+
+        # Cumulative energy at each window edge; energy inside a window is
+        # spread linearly, which is exact whenever a bar edge hits a window edge
+        edges = np.concatenate(([0], np.cumsum(window_sizes)))
+        energy = np.concatenate(([0.0], np.cumsum(window_sums)))
+
+        bounds = bar_boundaries(self.samples_seen, self.bar_count)
+        at_bounds = np.interp(bounds, edges, energy)
+        sums = at_bounds[1:] - at_bounds[:-1]
+        counts = np.diff(bounds)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_square = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+        return np.sqrt(np.maximum(mean_square, 0.0)), counts
+
+    def finish(self):
+        """Return the normalized log-RMS curve"""
+        rms, counts = self.finish_rms()
+        return normalize_bar_energies(rms, counts)
+
+
+def _iter_soundfile_blocks(path, block_frames):
+    with soundfile.SoundFile(path) as f:
+        yield f.samplerate
+        for block in f.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+            yield block
+
+
+def _iter_audioread_blocks(path):
+    with audioread.audio_open(path) as f:
+        yield f.samplerate
+        channels = max(1, f.channels)
+        for buf in f:
+            # audioread yields 16-bit little-endian PCM
+            pcm = np.frombuffer(buf, dtype='<i2').astype(np.float32) / 32768.0
+            yield pcm[:len(pcm) - len(pcm) % channels].reshape(-1, channels)
+
+
+def stream_bar_energies(path, bar_count=DEFAULT_BAR_COUNT,
+                        max_duration=MAX_ANALYSIS_DURATION, block_frames=STREAM_BLOCK_FRAMES):
+    """Decode an audio file block by block and return the normalized bar curve.
+
+    Uses soundfile (wav/flac/ogg/mp3) and falls back to audioread/ffmpeg for
+    containers like webm. Only one block plus the energy windows are held in
+    memory at a time. Raises if neither decoder can read the file.
+    """
+    decoders = []
+    if SOUNDFILE_AVAILABLE:
+        decoders.append(lambda: _iter_soundfile_blocks(path, block_frames))
+    if AUDIOREAD_AVAILABLE:
+        decoders.append(lambda: _iter_audioread_blocks(path))
+    if not decoders:
+        raise RuntimeError("No streaming audio decoder available (install soundfile or audioread)")
+
+    last_error = None
+    for open_blocks in decoders:
+        try:
+            blocks = open_blocks()
+            samplerate = next(blocks)
+            accumulator = StreamingBarAccumulator(bar_count, max_samples=int(samplerate * max_duration))
+            for block in blocks:
+                accumulator.add(block)
+                if accumulator.full:
+                    blocks.close()
+                    break
+            return accumulator.finish()
+        except Exception as e:
+            last_error = e
+    raise last_error
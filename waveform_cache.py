@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for waveform analysis and rendered codes.
+Entries are keyed by a SHA-256 of the audio bytes (plus the render parameters
+for images) and evicted least-recently-used once the store exceeds max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_audio_bytes(audio_data):
+    """SHA-256 hex digest of in-memory audio bytes"""
+    return hashlib.sha256(audio_data).hexdigest()
+
+
+def hash_audio_file(path):
+    """SHA-256 hex digest of an audio file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_key(audio_hash, **params):
+    """Cache key for a rendered waveform: audio hash + sorted render parameters"""
+    payload = json.dumps({"audio": audio_hash, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class WaveformCache:
+    """Disk store of bar curves (bars_<hash>.json) and rendered code URLs
+    (render_<key>.json) with LRU eviction by total size.
+
+    File mtimes record recency so the LRU order survives restarts and is
+    shared by every worker pointing at the same directory.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {}
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith("render_") and name.endswith(".png"):
+                # Image bytes stored by older versions; never read, only took space
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif os.path.isfile(path) and not name.endswith(".tmp"):
+                self._sizes[name] = os.path.getsize(path)
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _touch(self, *names):
+        for name in names:
+            try:
+                os.utime(self._path(name))
+            except OSError:
+                pass
+
+    def _write(self, name, data):
+        """Atomically write one cache file; the cache is best-effort so I/O errors are only logged"""
+        path = self._path(name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️  Waveform cache write failed for {name}: {e}")
+            return
+        with self._lock:
+            self._sizes[name] = len(data)
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _evict(self):
+        """Delete least recently used entries until the store fits in max_bytes.
+        Files sharing a stem are evicted together."""
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            entries = {}
+            names_by_stem = {}
+            for name in list(self._sizes):
+                try:
+                    mtime = os.path.getmtime(self._path(name))
+                except OSError:
+                    total -= self._sizes.pop(name, 0)
+                    continue
+                stem = os.path.splitext(name)[0]
+                entries[stem] = max(entries.get(stem, 0), mtime)
+                names_by_stem.setdefault(stem, []).append(name)
+            for _, stem in sorted((mtime, stem) for stem, mtime in entries.items()):
+                if total <= self.max_bytes:
+                    break
+                for name in names_by_stem[stem]:
+                    try:
+                        os.remove(self._path(name))
+                    except OSError:
+                        pass
+                    total -= self._sizes.pop(name, 0)
+
+    def get_bars(self, audio_hash, bar_count):
+        """Return the cached bar curve for this audio, or None"""
+        name = f"bars_{audio_hash}_{bar_count}.json"
+        entry = self._read_json(name)
+        if entry is None:
+            return None
+        self._touch(name)
+        return entry.get("bars")
+
+    def put_bars(self, audio_hash, bar_count, bars):
+        name = f"bars_{audio_hash}_{bar_count}.json"
+        self._write(name, json.dumps({"bars": [float(b) for b in bars]}).encode("utf-8"))
+        self._evict()
+
+    def get_render(self, key):
+        """Return the cached render metadata (waveform_url, ...) for this key, or None"""
+        entry = self._read_json(f"render_{key}.json")
+        if entry is None:
+            return None
+        self._touch(f"render_{key}.json")
+        return entry
+
+    def put_render(self, key, waveform_url, **urls):
+        """Record where a rendered code was stored; extra keyword URLs (e.g. waveform_svg_url)
+        are kept in its metadata. The image itself lives at the URL, not in the cache"""
+        self._write(f"render_{key}.json", json.dumps({"waveform_url": waveform_url, **urls}).encode("utf-8"))
+        self._evict()
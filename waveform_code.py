@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+The Spotify-style waveform code (800x250 bars + #scan_id) used on orders.
+Kept out of supabase_docker_api so tools that run outside the API process
+(e.g. regenerate_waveforms worker processes) render exactly the same code.
+"""
+
+from PIL import ImageDraw
+
+from waveform_png import DEFAULT_PNG_PROFILE, encode_png
+from waveform_raster import bars_image
+from waveform_render import get_render_context
+from waveform_sprites import get_bar_atlas, spotify_code_radius
+from waveform_svg import render_svg
+
+# Bump whenever the waveform image template changes (part of the render cache key)
+SPOTIFY_CODE_VERSION = "spotify-800x250-v1"
+
+
+def render_spotify_code(waveform_data, scan_id=None, image_format="png", backend="pil", png_profile=DEFAULT_PNG_PROFILE):
+    """Create the Spotify-style waveform code image with vertical bars
+    Shows the waveform and the scan_id at the bottom.
+    image_format "png" returns PNG bytes (backend "pil" or "numpy", encoded with
+    png_profile), "svg" the same layout as SVG (utf-8 bytes).
+    """
+    width = 800
+    height = 250
+    bar_count = len(waveform_data)
+    bar_width = 8
+    bar_spacing = 4
+    max_bar_height = 140
+    
+    # Center bars vertically in the top part
+    bars_y_center = 100
+    
+    if image_format == "svg":
+        # String assembly only: same bar boxes and label position as the PNG
+        start_x = (width - (bar_count * (bar_width + bar_spacing) - bar_spacing)) // 2
+        bars = []
+        for i, amplitude in enumerate(waveform_data):
+            bar_height = max(8, int(amplitude * max_bar_height))
+            bars.append((start_x + i * (bar_width + bar_spacing), bars_y_center - (bar_height // 2), bar_height))
+        svg = render_svg(bars, width, height, bar_width, spotify_code_radius,
+                         label=f"#{scan_id}" if scan_id else None, label_top=height - 60, font_size=32)
+        return svg.encode("utf-8")
+    
+    # Fonts are loaded once per process in the render context
+    context = get_render_context(width, height)
+    
+    if backend == "numpy":
+        # Whole bar canvas built as one array, only the label is drawn by PIL
+        image = bars_image(waveform_data, width, height, bar_width=bar_width, bar_spacing=bar_spacing,
+                           max_bar_height=max_bar_height, min_bar_height=8, center_y=bars_y_center,
+                           radius_rule=spotify_code_radius)
+    else:
+        # White background copied from the process-wide template
+        image = context.canvas()
+        
+        # Calculate total width needed for bars
+        total_bars_width = bar_count * (bar_width + bar_spacing) - bar_spacing
+        start_x = (width - total_bars_width) // 2
+        
+        # Draw waveform bars from the pre-rendered sprites (one per possible height)
+        atlas = get_bar_atlas(bar_width, spotify_code_radius, 8, max_bar_height)
+        for i, amplitude in enumerate(waveform_data):
+            bar_height = max(8, int(amplitude * max_bar_height))
+            y_start = bars_y_center - (bar_height // 2)
+            x_start = start_x + i * (bar_width + bar_spacing)
+            atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
+    draw = ImageDraw.Draw(image)
+    
+    # Add Scan ID text at the bottom
+    # User requested: wave plus id number in bottom nothing else
+    if scan_id:
+        try:
+            # Font installed in Dockerfile (or bundled), loaded once per process
+            font_size = 32
+            font = context.font(font_size)
+            
+            text = f"#{scan_id}"
+            
+            # Center the text
+            text_w, _ = context.text_size(text, font_size)
+            
+            text_x = (width - text_w) // 2
+            text_y = height - 60  # Positioned at the bottom
+            
+            draw.text((text_x, text_y), text, fill='black', font=font)
+            print(f"✅ Added Scan ID to waveform: {text}")
+        except Exception as e:
+            print(f"⚠️ Could not add text to waveform image: {e}")
+            
+    # Convert to bytes with the configured PNG profile
+    return encode_png(image, png_profile)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Durable background job queue for waveform generation.
+Jobs live in a small SQLite database so they survive restarts and can be
+shared by several gunicorn workers; a pool of threads claims and runs them.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import closing
+from datetime import datetime
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class WaveformJobQueue:
+    """SQLite-backed job queue with a thread worker pool.
+
+    handler(payload) is called for each job and must return a JSON-serializable
+    result dict. Exceptions are retried up to max_attempts, then the job is
+    marked failed. Jobs stuck in running for longer than stale_after seconds
+    (their process died) are claimed again while attempts remain, else failed.
+    """
+
+    def __init__(self, db_path, handler, workers=2, max_attempts=3, poll_interval=2.0, stale_after=600):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS waveform_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scan_id TEXT NOT NULL UNIQUE,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_waveform_jobs_status ON waveform_jobs (status, id)")
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"waveform-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ Waveform job queue started with {self.workers} workers ({self.db_path})")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def enqueue(self, scan_id, payload):
+        """Add a job for scan_id; re-enqueueing an existing scan_id resets it"""
+        now = datetime.now().isoformat()
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                INSERT INTO waveform_jobs (scan_id, payload, status, attempts, created_at, updated_at)
+                VALUES (?, ?, ?, 0, ?, ?)
+                ON CONFLICT(scan_id) DO UPDATE SET
+                    payload = excluded.payload, status = excluded.status, attempts = 0,
+                    result = NULL, error = NULL, updated_at = excluded.updated_at
+            """, (scan_id, json.dumps(payload), JOB_QUEUED, now, now))
+        self._wakeup.set()
+
+    def get(self, scan_id):
+        """Return the job for scan_id as a dict, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM waveform_jobs WHERE scan_id = ?", (scan_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _claim(self):
+        """Atomically move the oldest queued (or stale running) job to running and return it"""
+        stale_before = datetime.fromtimestamp(time.time() - self.stale_after).isoformat()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A stale job that already used every attempt most likely kills its worker
+                # (OOM, crash in the decoder): give up on it instead of re-claiming it forever
+                conn.execute(
+                    "UPDATE waveform_jobs SET status = ?, error = ?, updated_at = ? "
+                    "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                    (JOB_FAILED, "worker stopped while running the job (attempts exhausted)",
+                     datetime.now().isoformat(), JOB_RUNNING, stale_before, self.max_attempts)
+                )
+                row = conn.execute(
+                    "SELECT * FROM waveform_jobs WHERE status = ? OR (status = ? AND updated_at < ? AND attempts < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, stale_before, self.max_attempts)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE waveform_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (JOB_RUNNING, datetime.now().isoformat(), row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE waveform_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error,
+                 datetime.now().isoformat(), job_id)
+            )
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                row = self._claim()
+            except Exception as e:
+                print(f"⚠️ Waveform job claim failed: {e}")
+                row = None
+
+            if not row:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            scan_id = row["scan_id"]
+            attempts = row["attempts"] + 1
+            started = time.time()
+            print(f"⚙️  Waveform job {scan_id} started (attempt {attempts})")
+            try:
+                result = self.handler(json.loads(row["payload"]))
+                self._finish(row["id"], JOB_DONE, result=result)
+                print(f"✅ Waveform job {scan_id} done in {time.time() - started:.2f}s")
+            except Exception as e:
+                traceback.print_exc()
+                status = JOB_FAILED if attempts >= self.max_attempts else JOB_QUEUED
+                self._finish(row["id"], status, error=str(e))
+                print(f"❌ Waveform job {scan_id} failed (attempt {attempts}): {e}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PNG encoding profiles for the waveform code images.
+The codes are black on white, so the hot path stores a 1-bit PNG with a fast
+zlib level instead of an RGB PNG through optimize=True; other profiles keep
+the anti-aliased label (grayscale) for archival re-encodes. Encoded sizes and
+times are tallied per profile for /health.
+"""
+
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+
+# mode: pixel format written (None keeps the image's own), threshold: gray
+# level at or above which a pixel becomes white in 1-bit output
+PNG_PROFILES = {
+    # Order path: 1-bit, fastest zlib level
+    "fast": {"mode": "1", "threshold": 128, "compress_level": 1, "optimize": False},
+    # 1-bit, best zlib level with filter search
+    "bilevel": {"mode": "1", "threshold": 128, "compress_level": 9, "optimize": True},
+    # Archival re-encodes: lossless grayscale, maximum compression
+    "archive": {"mode": "L", "compress_level": 9, "optimize": True},
+    # What create_spotify_waveform_image wrote before profiles existed
+    "legacy": {"mode": None, "compress_level": 6, "optimize": True},
+}
+DEFAULT_PNG_PROFILE = "fast"
+
+
+class PngEncodeStats:
+    """Images, bytes and encode seconds per profile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def record(self, profile, size, seconds):
+        with self._lock:
+            entry = self._profiles.setdefault(profile, {"images": 0, "bytes": 0, "seconds": 0.0})
+            entry["images"] += 1
+            entry["bytes"] += size
+            entry["seconds"] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                profile: {
+                    "images": entry["images"],
+                    "avg_bytes": entry["bytes"] // entry["images"],
+                    "avg_ms": round(entry["seconds"] * 1000 / entry["images"], 3),
+                }
+                for profile, entry in self._profiles.items()
+            }
+
+
+png_encode_stats = PngEncodeStats()
+
+
+def convert_for_profile(image, profile):
+    """image in the pixel format the profile writes"""
+    settings = PNG_PROFILES[profile]
+    mode = settings["mode"]
+    if mode is None or image.mode == mode:
+        return image
+    if mode == "1":
+        # Plain threshold: convert('1') would dither the anti-aliased label
+        threshold = settings["threshold"]
+        return image.convert('L').point(lambda value: 255 if value >= threshold else 0, mode='1')
+    return image.convert(mode)
+
+
+def encode_png(image, profile=DEFAULT_PNG_PROFILE, record=True):
+    """PNG bytes of a PIL image with one of PNG_PROFILES (tallied in png_encode_stats if record)"""
+    if profile not in PNG_PROFILES:
+        raise ValueError(f"Unknown PNG profile '{profile}' (expected one of {', '.join(PNG_PROFILES)})")
+    settings = PNG_PROFILES[profile]
+    started = time.perf_counter()
+    buffer = BytesIO()
+    convert_for_profile(image, profile).save(buffer, format='PNG', compress_level=settings["compress_level"],
+                                             optimize=settings["optimize"])
+    data = buffer.getvalue()
+    if record:
+        png_encode_stats.record(profile, len(data), time.perf_counter() - started)
+    return data
+
+
+def reencode_png(data, profile="archive"):
+    """Re-encode stored PNG bytes (e.g. codes already in Storage) with another profile"""
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        return encode_png(image, profile)
+
+
+def compare_profiles(image, rounds=5):
+    """{profile: {"bytes", "ms"}} for one image, timing the best of `rounds` encodes"""
+    report = {}
+    for profile in PNG_PROFILES:
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            data = encode_png(image, profile, record=False)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        report[profile] = {"bytes": len(data), "ms": round(best * 1000, 3)}
+    return report
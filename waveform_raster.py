@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+NumPy rasterizer for waveform code bars.
+All bars are placed in one fancy-indexing step: a table holds every bar up
+to max_bar_height (height -> rounded mask, already positioned on the shared
+centre line), table[heights] gives the whole bar stack, and a reshape lays
+it out at the bar pitch. Bars taller than max_bar_height (amplitudes above
+1) are painted one by one afterwards, so the table size stays fixed. The
+masks come from waveform_sprites, so the pixels match the PIL renderers
+exactly; only the finished array is handed to PIL for the label and encoding.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from waveform_sprites import get_bar_atlas, half_height_radius
+
+INK = 0
+PAPER = 255
+
+
+@lru_cache(maxsize=32)
+def centered_bar_table(bar_width, radius_rule, min_height, max_height, center_y):
+    """(table, top): table[h] is the mask of a bar of height h whose box starts at
+    center_y - h // 2, stored relative to row `top` (shape: heights x rows x bar_width + 1).
+    The last entry, table[max_height + 1], is blank (a placeholder for taller bars)"""
+    atlas = get_bar_atlas(bar_width, radius_rule, min_height, max_height)
+    top = center_y - max_height // 2
+    rows = max_height + 2
+    table = np.zeros((max_height + 2, rows, bar_width + 1), dtype=bool)
+    for height in range(min_height, max_height + 1):
+        offset = center_y - height // 2 - top
+        table[height, offset:offset + height + 1] = np.asarray(atlas.sprite(height), dtype=bool)
+    table.setflags(write=False)
+    return table, top
+
+
+def bar_heights(waveform_data, max_bar_height, min_bar_height):
+    """Bar heights exactly as the PIL renderers compute them: max(min, int(a * max))"""
+    amplitudes = np.asarray(waveform_data, dtype=np.float64)
+    return np.maximum(min_bar_height, (amplitudes * max_bar_height).astype(np.int64))
+
+
+def rasterize_bars(waveform_data, width, height, bar_width=8, bar_spacing=4, max_bar_height=140,
+                   min_bar_height=8, center_y=None, radius_rule=half_height_radius):
+    """uint8 grayscale canvas (PAPER background) with the waveform bars in INK.
+
+    Bars are centred on the canvas horizontally and on center_y (default:
+    the canvas middle) vertically, like create_spotify_waveform_image.
+    """
+    center_y = height // 2 if center_y is None else center_y
+    heights = bar_heights(waveform_data, max_bar_height, min_bar_height)
+    canvas = np.full((height, width), PAPER, dtype=np.uint8)
+    bar_count = len(heights)
+    if not bar_count:
+        return canvas
+
+    table, top = centered_bar_table(bar_width, radius_rule, min_bar_height, max_bar_height, center_y)
+    tall = heights > max_bar_height
+    stack = table[np.where(tall, max_bar_height + 1, heights)]  # bars x rows x columns, one gather
+    pitch = bar_width + bar_spacing
+    start_x = (width - (bar_count * pitch - bar_spacing)) // 2
+
+    if pitch >= bar_width + 1:
+        # Non-overlapping bars: lay the stack out side by side at the bar pitch
+        band = np.zeros((stack.shape[1], bar_count, pitch), dtype=bool)
+        band[:, :, :bar_width + 1] = stack.transpose(1, 0, 2)
+        band = band.reshape(stack.shape[1], bar_count * pitch)
+    else:
+        band = np.zeros((stack.shape[1], (bar_count - 1) * pitch + bar_width + 1), dtype=bool)
+        for i in range(bar_count):
+            band[:, i * pitch:i * pitch + bar_width + 1] |= stack[i]
+
+    paint_mask(canvas, band, start_x, top)
+    if tall.any():
+        atlas = get_bar_atlas(bar_width, radius_rule, min_bar_height, max_bar_height)
+        for i in np.flatnonzero(tall):
+            bar_height = int(heights[i])
+            paint_mask(canvas, np.asarray(atlas.sprite(bar_height), dtype=bool), start_x + int(i) * pitch,
+                       center_y - bar_height // 2)
+    return canvas
+
+
+def paint_mask(canvas, mask, x, y):
+    """Set canvas pixels under mask (placed at x, y) to INK, clipped to the canvas"""
+    y0, x0 = max(y, 0), max(x, 0)
+    y1 = min(y + mask.shape[0], canvas.shape[0])
+    x1 = min(x + mask.shape[1], canvas.shape[1])
+    if y1 > y0 and x1 > x0:
+        canvas[y0:y1, x0:x1][mask[y0 - y:y1 - y, x0 - x:x1 - x]] = INK
+
+
+def bars_image(waveform_data, width, height, **layout):
+    """rasterize_bars() as a mode 'L' PIL image, ready for a label and encoding"""
+    return Image.fromarray(rasterize_bars(waveform_data, width, height, **layout), mode='L')
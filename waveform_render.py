@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Process-wide render context for the waveform code images.
+Fonts are resolved and loaded once per (paths, size), the blank canvas is
+copied from a template, and the bounding boxes of recently drawn labels are
+remembered, so a render no longer probes the filesystem or re-parses a TTF.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+BUNDLED_FONT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# System fonts first (installed by fonts-dejavu-core in Dockerfile.api), then
+# the TTFs in the repo root; files that fail to load are skipped
+DEFAULT_FONT_PATHS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    os.path.join(BUNDLED_FONT_DIR, "DejaVuSans-Bold.ttf"),
+    os.path.join(BUNDLED_FONT_DIR, "Roboto-Bold.ttf"),
+)
+
+LABEL_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=None)
+def load_font(size, paths=DEFAULT_FONT_PATHS):
+    """First loadable TrueType font in paths at this size (PIL's default font if none)"""
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    print(f"⚠️ Could not load a TTF font from {len(paths)} paths, using default")
+    return ImageFont.load_default()
+
+
+class WaveformRenderContext:
+    """Canvas template, fonts and label metrics for one image size.
+
+    canvas() returns a fresh copy of the blank template; text_bbox() is
+    draw.textbbox((0, 0), text, font) for the context's fonts, cached for
+    the last label_cache_size labels (re-renders of the same scan_id).
+    """
+
+    def __init__(self, width, height, background='white', mode='RGB', font_paths=DEFAULT_FONT_PATHS,
+                 label_cache_size=LABEL_CACHE_SIZE):
+        self.width = width
+        self.height = height
+        self.font_paths = tuple(font_paths)
+        self.label_cache_size = label_cache_size
+        self._template = Image.new(mode, (width, height), background)
+        self._measure = ImageDraw.Draw(Image.new(mode, (1, 1)))
+        self._labels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def canvas(self):
+        return self._template.copy()
+
+    def font(self, size):
+        return load_font(size, self.font_paths)
+
+    def text_bbox(self, text, size):
+        key = (text, size)
+        with self._lock:
+            bbox = self._labels.get(key)
+            if bbox is not None:
+                self._labels.move_to_end(key)
+                return bbox
+        font = self.font(size)
+        if hasattr(self._measure, 'textbbox'):
+            bbox = self._measure.textbbox((0, 0), text, font=font)
+        else:
+            # Older Pillow
+            text_w, text_h = self._measure.textsize(text, font=font)
+            bbox = (0, 0, text_w, text_h)
+        with self._lock:
+            self._labels[key] = bbox
+            while len(self._labels) > self.label_cache_size:
+                self._labels.popitem(last=False)
+        return bbox
+
+    def text_size(self, text, size):
+        left, top, right, bottom = self.text_bbox(text, size)
+        return right - left, bottom - top
+
+
+@lru_cache(maxsize=None)
+def get_render_context(width, height, background='white', font_paths=DEFAULT_FONT_PATHS):
+    """Shared context per image size and font list for the process"""
+    return WaveformRenderContext(width, height, background, font_paths=font_paths)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+SVG output for the waveform code images.
+The SVG is assembled from the same bar boxes the raster renderers paste
+(inclusive [x, y, x + bar_width, y + height] boxes, same corner radius) plus
+the label as text, so it lines up with the PNG at 1:1 and scales to any
+print resolution without another render.
+"""
+
+from xml.sax.saxutils import escape
+
+from waveform_sprites import half_height_radius
+
+SVG_CONTENT_TYPE = "image/svg+xml"
+LABEL_FONT_FAMILY = "DejaVu Sans, Verdana, Arial, sans-serif"
+# Ascent of DejaVu Sans Bold per unit of font size: PIL places the top of the
+# text at the given y, SVG places the baseline
+LABEL_ASCENT = 0.93
+
+
+def render_svg(bars, width, height, bar_width, radius_rule=half_height_radius, label=None, label_top=None,
+               font_size=32, background='white', fill='black'):
+    """SVG document (str) for bars given as (x, y, bar_height) boxes and an optional
+    label horizontally centred with its top at label_top"""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">',
+        f'<rect width="100%" height="100%" fill="{background}"/>',
+        f'<g fill="{fill}">',
+    ]
+    for x, y, bar_height in bars:
+        radius = radius_rule(bar_width, bar_height)
+        corner = f' rx="{radius}"' if radius > 0 else ''
+        parts.append(f'<rect x="{x}" y="{y}" width="{bar_width + 1}" height="{bar_height + 1}"{corner}/>')
+    parts.append('</g>')
+    if label:
+        baseline = (label_top if label_top is not None else height - font_size) + round(font_size * LABEL_ASCENT)
+        parts.append(
+            f'<text x="{width / 2:g}" y="{baseline}" text-anchor="middle" font-family="{LABEL_FONT_FAMILY}" '
+            f'font-weight="bold" font-size="{font_size}" fill="{fill}">{escape(str(label))}</text>'
+        )
+    parts.append('</svg>')
+    return ''.join(parts)
@@ -19,8 +19,11 @@ from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from io import BytesIO
+from waveform_analysis import DEFAULT_BAR_COUNT, extract_bar_energies
+from waveform_sprites import get_bar_atlas
+from waveform_render import get_render_context
 from decimal import Decimal
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
 app = Flask(__name__)
 CORS(app)
@@ -283,30 +286,13 @@ def generate_spotify_waveform_code(audio_url, order_id):
         print(f"❌ Spotify waveform generation error: {e}")
         return generate_fallback_waveform(order_id)
 
-def analyze_audio_waveform(audio_data):
+def analyze_audio_waveform(audio_data, bar_count=DEFAULT_BAR_COUNT):
     """Analyze audio data and extract waveform information using librosa"""
     try:
         with BytesIO(audio_data) as audio_buffer:
             y, sr = librosa.load(audio_buffer, sr=None)
             
-            bar_count = 60 
-            hop_length = len(y) // bar_count
-            waveform_data = []
-            
-            for i in range(bar_count):
-                start = i * hop_length
-                end = min((i + 1) * hop_length, len(y))
-                segment = y[start:end]
-                
-                if len(segment) > 0:
-                    rms = np.sqrt(np.mean(segment**2))
-                    normalized_rms = np.log1p(rms * 10) / np.log1p(1.0)
-                    normalized_rms = min(1.0, normalized_rms)
-                    waveform_data.append(normalized_rms)
-                else:
-                    waveform_data.append(0.1)
-            
-            return np.array(waveform_data)
+            return extract_bar_energies(y, bar_count)
             
     except Exception as e:
         print(f"⚠️  Audio analysis failed, using fallback: {e}")
@@ -336,7 +322,8 @@ def create_spotify_waveform_image(waveform_data, scan_id=str):
     bar_spacing = 4
     max_bar_height = 140 # Fixed bar height area
     
-    image = Image.new('RGB', (width, height), 'white')
+    context = get_render_context(width, height)
+    image = context.canvas()
     draw = ImageDraw.Draw(image)
     
     total_bars_width = bar_count * (bar_width + bar_spacing) - bar_spacing
@@ -344,45 +331,23 @@ def create_spotify_waveform_image(waveform_data, scan_id=str):
     
     # Draw bars centered vertically in the upper portion
     bars_y_center = 120
+    atlas = get_bar_atlas(bar_width, min_height=4, max_height=max_bar_height)
     
     for i, amplitude in enumerate(waveform_data):
         bar_height = max(4, int(amplitude * max_bar_height))
         y_start = bars_y_center - (bar_height // 2)
-        y_end = y_start + bar_height
         x_start = start_x + i * (bar_width + bar_spacing)
-        x_end = x_start + bar_width
-        
-        corner_radius = min(bar_width // 2, (y_end - y_start) // 2)
-        if corner_radius <= 0:
-             draw.rectangle([x_start, y_start, x_end, y_end], fill='black')
-        else:
-             draw.rounded_rectangle([x_start, y_start, x_end, y_end], radius=corner_radius, fill='black')
+        atlas.paste_bar(image, x_start, y_start, bar_height, 'black')
     
     try:
-        # Try to load a nice large font
+        # A nice large font: DejaVuSans Bold (fonts-dejavu-core) or a bundled fallback, loaded once
         font_size = 48
-        try:
-            # Common path for DejaVuSans on Debian/Ubuntu (after installing fonts-dejavu-core)
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-        except OSError:
-            try:
-                # Fallback to plain Sans
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
-            except OSError:
-                # Fallback to default if fails
-                print("⚠️ Could not load TTF font, using default")
-                font = ImageFont.load_default()
+        font = context.font(font_size)
 
         text = str(scan_id)
         
         # Calculate text size for centering
-        if hasattr(draw, 'textbbox'):
-            left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
-            text_w = right - left
-            text_h = bottom - top
-        else:
-            # Fallback for older Pillow
-            text_w, text_h = draw.textsize(text, font=font)
+        text_w, text_h = context.text_size(text, font_size)
             
         text_x = (width - text_w) // 2
         text_y = height - 80 # Position near bottom